@@ -9,7 +9,7 @@ class AddIPCameraPopup(ctk.CTkToplevel):
         self.title("Add IP Camera (Wi-Fi)")
         
         window_width = 450
-        window_height = 450
+        window_height = 490
         screen_width = self.winfo_screenwidth()
         screen_height = self.winfo_screenheight()
         x_cordinate = int((screen_width / 2) - (window_width / 2))
@@ -54,7 +54,11 @@ class AddIPCameraPopup(ctk.CTkToplevel):
 
         ctk.CTkLabel(self, text="Monitoring Type:", anchor="w").pack(fill="x", padx=40)
         self.cam_type_combobox = ctk.CTkComboBox(self, values=["Exam Monitoring", "Room Decorum"])
-        self.cam_type_combobox.pack(fill="x", padx=40, pady=(0, 20))
+        self.cam_type_combobox.pack(fill="x", padx=40, pady=(0, 15))
+
+        # BAGO: Low-res substream (stream2) para sa AI at tiles; ang stream1 ay para sa recording lang
+        self.substream_var = ctk.BooleanVar(value=True)
+        ctk.CTkCheckBox(self, text="Use low-res substream for AI (saves CPU)", variable=self.substream_var).pack(fill="x", padx=40, pady=(0, 15))
 
         btn_frame = ctk.CTkFrame(self, fg_color="transparent")
         btn_frame.pack(fill="x", padx=40, pady=10)
@@ -99,7 +103,7 @@ class AddIPCameraPopup(ctk.CTkToplevel):
             rtsp_link = f"rtsp://{username}:{password}@{ip_input}:554/stream1"
 
         try:
-            self.parent_dashboard.add_camera_card_live(room_name=room, cam_type=cam_type, url=rtsp_link)
+            self.parent_dashboard.add_camera_card_live(room_name=room, cam_type=cam_type, url=rtsp_link, use_substream=self.substream_var.get())
             
             # --- THE FIX: BURAHIN MUNA ANG FORM BAGO MAG-MESSAGEBOX ---
             self.destroy() 
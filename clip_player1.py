@@ -0,0 +1,243 @@
+import customtkinter as ctk
+import bisect
+import datetime
+import os
+import threading
+import time
+import numpy as np
+from tkinter import messagebox
+
+from sems_player import ClipDecoder
+from sems_timeline import load_events, EVENT_VIOLATION, EVENT_TIMER_START, EVENT_TIMER_STOP, EVENT_TRACKS
+
+PLAYER_SIZE = (960, 540)
+PLAYER_SPEEDS = ["0.5x", "1x", "2x", "4x", "8x", "16x"]
+TIMELINE_HEIGHT = 36
+TIMELINE_COLORS = {EVENT_VIOLATION: "#ff4d4d", EVENT_TIMER_START: "#ffcc00", EVENT_TIMER_STOP: "#777777"}
+
+
+class ClipPlayerWindow(ctk.CTkToplevel):
+    # Built-in player para sa violation clips at recordings (hindi na os.startfile).
+    # Ang decode ay sa ClipDecoder thread; dito ay playhead, scrubbing at drawing lang.
+    # start_clock = epoch seconds na tatalunan pagka-load ng index (e.g. oras ng violation)
+    def __init__(self, master, file_path, title="Clip Player", start_clock=None):
+        super().__init__()
+        self.file_path = os.path.abspath(file_path)
+        self.title(f"{title} - {os.path.basename(self.file_path)}")
+
+        window_width, window_height = PLAYER_SIZE[0] + 40, PLAYER_SIZE[1] + 140 + TIMELINE_HEIGHT
+        screen_width = self.winfo_screenwidth()
+        screen_height = self.winfo_screenheight()
+        x_cordinate = int((screen_width / 2) - (window_width / 2))
+        y_cordinate = int((screen_height / 2) - (window_height / 2))
+        self.geometry(f"{window_width}x{window_height}+{x_cordinate}+{y_cordinate}")
+        self.focus_force()
+
+        self.decoder = ClipDecoder(self.file_path, PLAYER_SIZE).start()
+        self.playhead = 0.0     # Frame index (float para sa fractional na pag-abante)
+        self.playing = True
+        self.speed = 1.0
+        self.last_tick = time.time()
+        self.dragging = False
+        self.shown_image = None
+        self.pending_clock = start_clock
+
+        # Event timeline (sidecar ng recording); binabasa sa background para hindi ma-block ang pagbukas
+        self.events = None
+        self.event_frames = []  # Frames ng violation/timer markers (sorted) para sa prev/next
+        self.timeline_drawn_for = None
+        threading.Thread(target=self.load_timeline, daemon=True).start()
+
+        # --- VIDEO ---
+        self.video_label = ctk.CTkLabel(self, text="Loading...", fg_color="black", width=PLAYER_SIZE[0], height=PLAYER_SIZE[1], corner_radius=8)
+        self.video_label.pack(padx=20, pady=(20, 10))
+
+        # --- SCRUB BAR ---
+        self.slider = ctk.CTkSlider(self, from_=0, to=1, command=self.on_scrub)
+        self.slider.set(0)
+        self.slider.pack(fill="x", padx=20)
+        self.slider.bind("<ButtonPress-1>", lambda e: setattr(self, "dragging", True))
+        self.slider.bind("<ButtonRelease-1>", lambda e: setattr(self, "dragging", False))
+
+        # --- EVENT TIMELINE ---
+        self.timeline = ctk.CTkCanvas(self, height=TIMELINE_HEIGHT, bg="#1e1e1e", highlightthickness=0)
+        self.timeline.pack(fill="x", padx=28, pady=(6, 0))
+        self.timeline.bind("<Button-1>", self.on_timeline_click)
+        self.timeline.bind("<Configure>", lambda e: setattr(self, "timeline_drawn_for", None))
+
+        # --- CONTROLS ---
+        controls = ctk.CTkFrame(self, fg_color="transparent")
+        controls.pack(fill="x", padx=20, pady=10)
+
+        self.play_btn = ctk.CTkButton(controls, text="⏸ Pause", width=100, command=self.toggle_play)
+        self.play_btn.pack(side="left")
+        ctk.CTkButton(controls, text="⏪ 10s", width=70, fg_color="#3a3a3b", hover_color="#4a4a4a", command=lambda: self.skip(-10)).pack(side="left", padx=(10, 0))
+        ctk.CTkButton(controls, text="10s ⏩", width=70, fg_color="#3a3a3b", hover_color="#4a4a4a", command=lambda: self.skip(10)).pack(side="left", padx=(5, 0))
+        ctk.CTkButton(controls, text="◀ Event", width=70, fg_color="#3a3a3b", hover_color="#4a4a4a", command=lambda: self.jump_event(-1)).pack(side="left", padx=(10, 0))
+        ctk.CTkButton(controls, text="Event ▶", width=70, fg_color="#3a3a3b", hover_color="#4a4a4a", command=lambda: self.jump_event(1)).pack(side="left", padx=(5, 0))
+
+        self.speed_menu = ctk.CTkSegmentedButton(controls, values=PLAYER_SPEEDS, command=self.set_speed)
+        self.speed_menu.set("1x")
+        self.speed_menu.pack(side="left", padx=20)
+
+        self.time_label = ctk.CTkLabel(controls, text="00:00 / 00:00", font=("Segoe UI", 12), text_color="#aaaaaa")
+        self.time_label.pack(side="right")
+
+        self.bind("<space>", lambda e: self.toggle_play())
+        self.bind("<Left>", lambda e: self.skip(-5))
+        self.bind("<Right>", lambda e: self.skip(5))
+        self.bind("<Prior>", lambda e: self.jump_event(-1))
+        self.bind("<Next>", lambda e: self.jump_event(1))
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        if not os.path.exists(self.file_path):
+            messagebox.showerror("Error", f"Video file not found:\n{self.file_path}")
+            self.on_close()
+            return
+        self.tick()
+
+    # --- PLAYHEAD ---
+    def frame_count(self):
+        return max(1, self.decoder.frame_count)
+
+    def seek(self, index):
+        self.playhead = float(max(0, min(index, self.frame_count() - 1)))
+
+    def seek_time(self, seconds):
+        # Gamit ang frame index kung meron (tamang oras kahit hindi pantay ang frame rate ng clip)
+        ts = self.decoder.timestamps
+        if ts is not None and len(ts):
+            self.seek(int(np.searchsorted(ts - ts[0], seconds)))
+        else:
+            self.seek(int(seconds * self.decoder.fps))
+
+    def skip(self, seconds):
+        self.seek_time(self.position_seconds() + seconds)
+
+    def position_seconds(self, index=None):
+        index = int(self.playhead) if index is None else index
+        ts = self.decoder.timestamps
+        if ts is not None and 0 <= index < len(ts):
+            return ts[index] - ts[0]
+        return index / self.decoder.fps
+
+    def set_speed(self, value):
+        self.speed = float(value.rstrip("x"))
+
+    def toggle_play(self):
+        self.playing = not self.playing
+        self.play_btn.configure(text="⏸ Pause" if self.playing else "▶ Play")
+        if self.playing and int(self.playhead) >= self.frame_count() - 1:
+            self.seek(0) # Ulitin mula sa simula
+
+    def on_scrub(self, value):
+        self.seek(value * (self.frame_count() - 1))
+
+    # --- EVENT TIMELINE ---
+    def load_timeline(self):
+        events = load_events(self.file_path)
+        self.event_frames = sorted(row[0] for row in events if row[2] != EVENT_TRACKS)
+        self.events = events
+
+    def frame_x(self, index, width):
+        return index / max(1, self.frame_count() - 1) * (width - 1)
+
+    def draw_timeline(self):
+        # Iginuguhit lang ulit kapag nagbago ang haba ng video o laki ng canvas (hindi kada tick)
+        width = self.timeline.winfo_width()
+        if self.events is None or width <= 1: return
+        self.timeline_drawn_for = self.frame_count()
+        c = self.timeline
+        c.delete("all")
+
+        # Bilang ng tracks bilang step line sa ibaba
+        tracks = [(frame, value) for frame, _, kind, _, value in self.events if kind == EVENT_TRACKS]
+        peak = max([value for _, value in tracks] + [1])
+        points, last_y = [], TIMELINE_HEIGHT - 2
+        for frame, value in tracks:
+            x = self.frame_x(frame, width)
+            y = TIMELINE_HEIGHT - 2 - value / peak * (TIMELINE_HEIGHT / 2)
+            points += [x, last_y, x, y]
+            last_y = y
+        if points:
+            c.create_line(*points, width - 1, last_y, fill="#3a7ebf")
+
+        for frame, _, kind, _, _ in self.events:
+            color = TIMELINE_COLORS.get(kind)
+            if color:
+                x = self.frame_x(frame, width)
+                top = 2 if kind == EVENT_VIOLATION else TIMELINE_HEIGHT // 3
+                c.create_line(x, top, x, TIMELINE_HEIGHT // 2 + 4, fill=color, width=2 if kind == EVENT_VIOLATION else 1)
+        c.create_line(0, 0, 0, TIMELINE_HEIGHT, fill="white", tags="playhead")
+
+    def on_timeline_click(self, event):
+        # Tumalon sa pinakamalapit na marker kung malapit ang click, kundi sa mismong posisyon
+        width = max(2, self.timeline.winfo_width())
+        index = event.x / (width - 1) * (self.frame_count() - 1)
+        i = bisect.bisect_left(self.event_frames, index)
+        near = [f for f in self.event_frames[max(0, i - 1):i + 1] if abs(self.frame_x(f, width) - event.x) <= 5]
+        self.seek(min(near, key=lambda f: abs(f - index)) if near else index)
+
+    def jump_event(self, direction):
+        # O(log n) sa sorted na event frames
+        index = int(self.playhead)
+        if direction > 0:
+            i = bisect.bisect_right(self.event_frames, index)
+            if i < len(self.event_frames): self.seek(self.event_frames[i])
+        else:
+            i = bisect.bisect_left(self.event_frames, index)
+            if i > 0: self.seek(self.event_frames[i - 1])
+
+    def tick(self):
+        if not self.winfo_exists(): return
+        now = time.time()
+        dt, self.last_tick = now - self.last_tick, now
+
+        if self.pending_clock is not None and self.decoder.timestamps is not None:
+            # Tumalon sa eksaktong sandali (wall-clock) kapag handa na ang frame index
+            ts = self.decoder.timestamps
+            if len(ts) and ts[0] > 1e9: self.seek(int(np.searchsorted(ts, self.pending_clock)))
+            self.pending_clock = None
+
+        if self.playing and not self.dragging:
+            self.playhead += dt * self.decoder.fps * self.speed
+            if self.playhead >= self.frame_count() - 1:
+                self.playhead = self.frame_count() - 1
+                self.playing = False
+                self.play_btn.configure(text="▶ Play")
+
+        index = int(self.playhead)
+        # Sa mabilis na playback, bawat ika-step na frame lang ang dine-decode
+        step = max(1, int(round(self.speed * self.decoder.fps / 25.0))) if self.playing else 1
+        self.decoder.request(index, step)
+
+        img = self.decoder.get(index)
+        if img is not None and img is not self.shown_image:
+            self.shown_image = img
+            ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
+            self.video_label.configure(image=ctk_img, text="")
+            self.video_label.image = ctk_img
+
+        if not self.dragging:
+            self.slider.set(index / max(1, self.frame_count() - 1))
+        if self.events is not None and self.timeline_drawn_for != self.frame_count():
+            self.draw_timeline()
+        x = self.frame_x(index, self.timeline.winfo_width())
+        self.timeline.coords("playhead", x, 0, x, TIMELINE_HEIGHT)
+        self.time_label.configure(text=self.time_text(index))
+        self.after(40, self.tick) # ~25 fps na display
+
+    def time_text(self, index):
+        def fmt(sec):
+            sec = int(sec)
+            return f"{sec // 3600}:{sec % 3600 // 60:02d}:{sec % 60:02d}" if sec >= 3600 else f"{sec // 60:02d}:{sec % 60:02d}"
+        text = f"{fmt(self.position_seconds(index))} / {fmt(self.position_seconds(self.frame_count() - 1))}"
+        ts = self.decoder.timestamps
+        # Kung wall-clock ang index (galing sa recorder/clip writer), ipakita ang totoong oras
+        if ts is not None and 0 <= index < len(ts) and ts[index] > 1e9:
+            text += "   " + datetime.datetime.fromtimestamp(ts[index]).strftime("%I:%M:%S %p")
+        return text
+
+    def on_close(self):
+        self.decoder.stop()
+        self.destroy()
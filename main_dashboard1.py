@@ -1,11 +1,7 @@
 import customtkinter as ctk
-import cv2
-import numpy as np
 import threading
-import time  
-from PIL import Image
+import time
 import ctypes  
-import mediapipe as mp 
 import os
 
 # --- Force OpenCV to use TCP for RTSP (Fixes Blurry/Gray Video Streams) ---
@@ -21,59 +17,17 @@ from reports1 import ReportsFrame
 from replay_system1 import ReplaySystemFrame
 from add_local_camera1 import AddLocalCameraPopup
 from add_ip_camera1 import AddIPCameraPopup
-
-# --- Load Deep Learning Models (MobileNet-SSD) ---
-try:
-    person_net = cv2.dnn.readNetFromCaffe("MobileNetSSD_deploy.prototxt", "MobileNetSSD_deploy.caffemodel")
-    print("SUCCESS: MobileNet-SSD Loaded for Exam & Decorum Monitoring!")
-except Exception as e:
-    print(f"ERROR: MobileNet files missing! Error: {e}")
-    person_net = None
-
-# --- MediaPipe Initializers ---
-mp_pose = mp.solutions.pose
-mp_face_detection = mp.solutions.face_detection 
-mp_drawing = mp.solutions.drawing_utils
-
-class VideoStream:
-    def __init__(self, src):
-        if isinstance(src, int):
-            self.cap = cv2.VideoCapture(src)
-        else:
-            self.cap = cv2.VideoCapture(src, cv2.CAP_FFMPEG)
-            
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1920)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 1080)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        
-        self.grabbed, self.frame = self.cap.read()
-        self.started = False
-        self.read_lock = threading.Lock()
-
-    def start(self):
-        if self.started: return
-        self.started = True
-        self.thread = threading.Thread(target=self.update, args=(), daemon=True)
-        self.thread.start()
-        return self
-
-    def update(self):
-        while self.started:
-            grabbed, frame = self.cap.read()
-            if grabbed:
-                with self.read_lock:
-                    self.grabbed, self.frame = grabbed, frame
-
-    def read(self):
-        with self.read_lock:
-            if self.frame is not None:
-                return self.grabbed, self.frame.copy()
-            return False, None
-
-    def stop(self):
-        self.started = False
-        if hasattr(self, 'thread'): self.thread.join()
-        self.cap.release()
+from sems_pipeline import InferencePipeline
+from sems_reconciler import GhostReconciler
+from sems_stream import VideoStream, StreamSupervisor, substream_url
+
+# --- Camera Health Indicator (text, kulay) ---
+HEALTH_STYLES = {
+    "connecting": ("CONNECTING", "#aaaaaa"),
+    "live": ("LIVE", "#00FF00"),
+    "stalled": ("STALLED", "#ffaa00"),
+    "reconnecting": ("RECONNECTING", "#ff4d4d"),
+}
 
 class SEMSDashboard(ctk.CTk):
     def __init__(self):
@@ -84,6 +38,12 @@ class SEMSDashboard(ctk.CTk):
         
         self.active_cameras = []
         self.fullscreen_cam_data = None 
+        self.pipeline = InferencePipeline()
+        self.stream_supervisor = StreamSupervisor().start()
+        # Ghost records (DB row na wala nang video) ay nililinis sa background, hindi sa Reports/Replay
+        self.reconciler = GhostReconciler(self.pipeline.events).start()
+        self.last_health_update = 0
+        self.last_qos_update = 0
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
         # --- Sidebar ---
@@ -159,59 +119,21 @@ class SEMSDashboard(ctk.CTk):
 
         if not cam.get("is_recording", False):
             # --- START RECORDING ---
-            import datetime
-            import os
-            
-            # Sinisigurado ng system na may "replays" folder. Kung wala, gagawa siya auto.
-            if not os.path.exists("replays"):
-                os.makedirs("replays")
-                
-            date_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"record_{cam['room_name'].replace(' ', '_')}_{date_str}.avi"
-            
-            # BAGO: Pinagsama natin ang folder name at filename (e.g. replays/record_Room1_date.avi)
-            filepath = os.path.join("replays", filename) 
-            
+            # Ang SegmentedRecorder na ang gagawa ng "replays" folder at ng mga file (isa kada segment);
+            # ang worker ang nagpapasa ng frames kasama ang capture timestamp
             ret, frame = cam["stream"].read()
             if ret:
-                h, w = frame.shape[:2]
-                fourcc = cv2.VideoWriter_fourcc(*'XVID')
-                
-                # BAGO: Ginamit natin ang 'filepath' imbes na 'filename' lang
-                cam["video_writer"] = cv2.VideoWriter(filepath, fourcc, 20.0, (w, h))
-                cam["is_recording"] = True
-                
-                # BAGO: Ise-save natin ang buong path para mahanap siya ng Replay System
-                cam["record_filepath"] = filepath 
-                cam["record_start_time"] = datetime.datetime.now().strftime("%Y-%m-%d %I:%M %p")
-                
+                self.pipeline.start_recording(cam)
                 self.record_btn.configure(text="⏹ Stop & Save", fg_color="#ff4d4d", hover_color="#cc0000")
         else:
             # --- STOP RECORDING ---
-            cam["is_recording"] = False
-            if "video_writer" in cam and cam["video_writer"] is not None:
-                cam["video_writer"].release()
-                cam["video_writer"] = None
-            
+            # Ang huling segment ay ire-register sa database ng recorder thread,
+            # tapos lalabas sa Replay System sa susunod na update_loop
+            self.pipeline.stop_recording(cam)
             self.record_btn.configure(text="⏺ Start Recording", fg_color="#28a745", hover_color="#218838")
-            
-            room = cam['room_name']
-            cam_type = cam['type']
-            start_date = cam["record_start_time"]
-            saved_filepath = cam["record_filepath"] 
-            
-            # --- BAGO: ISAVE SA DATABASE ---
-            from sems_db import Database
-            db = Database()
-            db_id = db.insert_record(room, cam_type, start_date, saved_filepath)
-            
-           # Ipasa ang totoong Database ID (db_id) pabalik sa UI natin
-            self.replay_frame.add_recorded_video(db_id, room, start_date, saved_filepath)
-            
+
             from tkinter import messagebox
-            import os
-            just_filename = os.path.basename(saved_filepath)
-            messagebox.showinfo("Monitoring Saved", f"Video '{just_filename}' successfully saved to replay system!")
+            messagebox.showinfo("Monitoring Saved", f"Recording for '{cam['room_name']}' is being saved to the replay system!")
 
     def hide_all_frames(self):
         for frame in [self.dashboard_frame, self.fullscreen_frame, self.reports_frame, self.replay_frame]:
@@ -232,29 +154,27 @@ class SEMSDashboard(ctk.CTk):
 
     # --- BAGO: Camera Database Management ---
     def load_saved_cameras(self):
-        from sems_db import Database
-        db = Database()
-        saved_cams = db.fetch_all_cameras()
-        db.close()
+        from sems_db import get_db
+        saved_cams = get_db().fetch_all_cameras()
         
+        # Hindi na naghihintay kada camera: bawat VideoStream ay nagbubukas sa sariling thread,
+        # kaya sabay-sabay silang kumokonekta habang "Connecting..." ang nakalagay sa card
         for cam in saved_cams:
-            room, cam_type, url = cam
+            room, cam_type, url, use_substream = cam
             # Kung local IP camera, string siya. Kung web camera ng laptop, convert to int.
             source = int(url) if url.isdigit() else url 
-            self.add_camera_card_live(room, cam_type, source, is_loading_from_db=True)
+            self.add_camera_card_live(room, cam_type, source, is_loading_from_db=True, use_substream=bool(use_substream))
 
-    def save_camera_to_db(self, room_name, cam_type, url):
-        from sems_db import Database
-        db = Database()
-        db.insert_camera(room_name, cam_type, str(url))
-        db.close()
+    def save_camera_to_db(self, room_name, cam_type, url, use_substream=True):
+        from sems_db import get_db
+        get_db().insert_camera(room_name, cam_type, str(url), int(use_substream))
 
-    def add_camera_card_live(self, room_name, cam_type, url=None, is_loading_from_db=False):
+    def add_camera_card_live(self, room_name, cam_type, url=None, is_loading_from_db=False, use_substream=True):
         source = url if url is not None else 0 # Default sa 0 (built-in cam) kung walang url
         
         # I-save sa database kapag manual na idinagdag (hindi galing sa loading)
         if not is_loading_from_db:
-            self.save_camera_to_db(room_name, cam_type, source)
+            self.save_camera_to_db(room_name, cam_type, source, use_substream)
             
         index = len(self.active_cameras)
         row, col = index // 3, index % 3
@@ -267,385 +187,126 @@ class SEMSDashboard(ctk.CTk):
         video_label = ctk.CTkLabel(view, text="Connecting...")
         video_label.pack(expand=True, fill="both")
         
-        stream = VideoStream(source).start()
+        # --- DUAL-STREAM: substream para sa AI at tiles, main stream para sa recording/clips lang ---
+        sub_source = substream_url(source) if use_substream else None
+        if sub_source:
+            stream = VideoStream(sub_source, resolution=None).start()
+            main_stream = VideoStream(source, active=False).start()
+        else:
+            stream = VideoStream(source).start()
+            main_stream = None
         
-        pose_detector = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) if cam_type == "Room Decorum" else None
-        face_detector = mp_face_detection.FaceDetection(model_selection=1, min_detection_confidence=0.3) if cam_type == "Exam Monitoring" else None
-
+        # Ang AI state (detectors, tracked faces, timers) ay nasa CameraAnalyzer na ng worker
         cam_data = {
-            "stream": stream, "label": video_label, "card": card, "room_name": room_name, "type": cam_type,
-            "tracked_faces": {}, "face_id_counter": 0, "pose_detector": pose_detector,
-            "face_detector": face_detector, "decorum_timers": {"standing_start": None}, "student_memory": []
+            "stream": stream, "main_stream": main_stream, "label": video_label, "card": card, "room_name": room_name, "type": cam_type,
+            "record_lock": threading.Lock(), "render_size": None, "status_text": "", "qos": "visible"
         }
+        for s in self.camera_streams(cam_data):
+            self.stream_supervisor.watch(s)
         self.active_cameras.append(cam_data)
+        self.pipeline.add_camera(cam_data)
         video_label.bind("<Button-1>", lambda event, c=cam_data: self.enter_fullscreen(c))
         
         info = ctk.CTkFrame(card, fg_color="transparent")
         info.pack(fill="x", padx=12, pady=(0, 10))
         ctk.CTkLabel(info, text=f"{room_name} ({cam_type})", font=("Segoe UI", 12)).pack(side="left")
+        cam_data["status_label"] = ctk.CTkLabel(info, text="● CONNECTING", font=("Segoe UI", 10, "bold"), text_color="#aaaaaa")
+        cam_data["status_label"].pack(side="left", padx=(8, 0))
         ctk.CTkButton(info, text="✖", width=25, height=25, fg_color="#ff4d4d", command=lambda c=cam_data: self.remove_camera(c)).pack(side="right")
 
     def update_loop(self):
-        current_time = time.time() 
+        # --- Ang Tk thread ay taga-display na lang; ang AI ay nasa CameraWorker threads ---
+        events = self.pipeline.drain_events()
+        for ev in events:
+            if ev[0] == "violation":
+                # I-update ang Reports Table nang live! (bagong row lang, pinagsasama ng Reports ang sabay-sabay)
+                self.reports_frame.add_report_entry(ev[2])
+            elif ev[0] == "ghosts":
+                # Mga row na wala nang video file (galing sa GhostReconciler)
+                _, table, ids = ev
+                if table == "violations": self.reports_frame.remove_rows(ids)
+                else: self.replay_frame.remove_records(ids)
+            elif ev[0] == "recording":
+                # Bawat natapos na recording segment ay may sariling card sa Replay System
+                _, cam, db_id, start_date, filepath = ev
+                self.replay_frame.add_recorded_video(db_id, cam['room_name'], start_date, filepath)
+
+        # QoS tiers (fullscreen/visible/hidden), hindi kailangang kada tick
+        if time.time() - self.last_qos_update > 0.25:
+            self.last_qos_update = time.time()
+            self.update_qos()
+
         for cam in self.active_cameras:
-            ret, frame = cam["stream"].read()
-            if ret and frame is not None:
-                ih, iw, _ = frame.shape
-                
-                # =========================================================================
-                # EXAM MONITORING LOGIC (MobileNet + Face Fusion)
-                # =========================================================================
-                if cam["type"] == "Exam Monitoring":
-                    current_frame_candidates = []
-                    turned_faces = []
-
-                    # 1. FACE AI
-                    if cam["face_detector"]:
-                        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        res = cam["face_detector"].process(rgb)
-                        if res.detections:
-                            for det in res.detections:
-                                b = det.location_data.relative_bounding_box
-                                fx, fy = int(b.xmin * iw), int(b.ymin * ih)
-                                fw, fh = int(b.width * iw), int(b.height * ih)
-                                
-                                is_t = False
-                                kp = det.location_data.relative_keypoints
-                                if len(kp) >= 6:
-                                    nx, rx, lx = kp[2].x, kp[4].x, kp[5].x
-                                    if abs(rx - lx) > 0.01:
-                                        rat = (nx - min(rx, lx)) / abs(rx - lx)
-                                        if rat < 0.10 or rat > 0.90: is_t = True
-                                        
-                                turned_faces.append((fx, fy, fw, fh, is_t))
-                                # Binawasan natin ang padding at ginawang 1.5 na lang ang haba imbes na 3
-                                current_frame_candidates.append([max(0, fx - 10), max(0, fy - 20), fw + 20, int(fh * 1.5), is_t])
-
-                    # 2. MOBILENET SSD
-                    if person_net:
-                        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 0.007843, (300, 300), 127.5)
-                        person_net.setInput(blob)
-                        dets = person_net.forward()
-                        for i in range(dets.shape[2]):
-                            conf = dets[0, 0, i, 2]
-                            if int(dets[0, 0, i, 1]) == 15 and conf > 0.35: 
-                                box = dets[0, 0, i, 3:7] * np.array([iw, ih, iw, ih])
-                                sx, sy, ex, ey = box.astype("int")
-                                bw, bh = ex - sx, ey - sy
-                                
-                                if bw > 30 and bh > 60:
-                                    is_turning = False
-                                    for (fx, fy, fw, fh, t) in turned_faces:
-                                        fcx, fcy = fx + fw/2, fy + fh/2
-                                        if sx < fcx < ex and sy < fcy < ey:
-                                            if t: is_turning = True
-                                    current_frame_candidates.append([sx, sy, bw, bh, is_turning])
-
-                    # 3. TRACKING & UI RENDER
-                    current_frame_candidates = sorted(current_frame_candidates, key=lambda x: x[2]*x[3], reverse=True)[:15]
-                    m_ids = set()
-                    
-                    for (nx, ny, nw, nh, is_t) in current_frame_candidates:
-                        ncx, ncy = nx + nw/2, ny + nh/2
-                        mid = None
-                        min_dist = 150 
-                        
-                        for sid, d in cam["tracked_faces"].items():
-                            if sid not in m_ids:
-                                dist = np.linalg.norm(np.array([ncx, ncy]) - np.array(d["center"]))
-                                if dist < min_dist:
-                                    min_dist = dist
-                                    mid = sid
-                        
-                        if mid:
-                            d = cam["tracked_faces"][mid]
-                            px, py, pw, ph = d["box"]
-                            sx = int(px * 0.6 + nx * 0.4)
-                            sy = int(py * 0.6 + ny * 0.4)
-                            sw = int(pw * 0.6 + nw * 0.4)
-                            sh = int(ph * 0.6 + nh * 0.4)
-                            
-                            d.update({"box": (sx, sy, sw, sh), "center": (ncx, ncy), "last_seen": current_time})
-                            
-                            if "buf" not in d: d["buf"] = []
-                            d["buf"].append(is_t)
-                            d["buf"] = d["buf"][-10:]
-                            d["is_t"] = sum(d["buf"]) > 6
-                            m_ids.add(mid)
-                        else:
-                            cam["face_id_counter"] += 1
-                            cam["tracked_faces"][cam["face_id_counter"]] = {
-                                "box": (nx, ny, nw, nh), "center": (ncx, ncy), 
-                                "last_seen": current_time, "t_start": None, "is_t": is_t, "buf": [is_t],
-                                "snapshot_saved": False  # BAGO ITO
-                            }
-
-                    new_f = {}
-                    for sid, d in cam["tracked_faces"].items():
-                        if current_time - d["last_seen"] < 1.0: 
-                            x, y, w, h = d["box"]
-                            lbl, clr = "Student", (0, 255, 0)
-                            
-                            # Siguraduhin na may video_buffer list ang bawat student
-                            if "video_buffer" not in d:
-                                d["video_buffer"] = []
-
-                            if d["is_t"]:
-                                if d["t_start"] is None: 
-                                    d["t_start"] = current_time
-                                    d["snapshot_saved"] = False
-                                    d["video_buffer"] = [] # I-clear ang buffer kapag nag-start ang timer
-                                elap = current_time - d["t_start"]
-                                if elap >= 7: 
-                                    lbl, clr = "SUSPICIOUS!", (0, 0, 255)
-                                else: 
-                                    lbl, clr = f"Looking Around ({int(7-elap)}s)", (0, 255, 255)
-                            else: 
-                                d["t_start"] = None
-                                d["snapshot_saved"] = False
-                                d["video_buffer"] = [] # Burahin ang record kapag bumalik ang tingin sa tama
-                            
-                            # I-drawing ang box at text sa frame
-                            cv2.rectangle(frame, (x, y), (x+w, y+h), clr, 2)
-                            cv2.putText(frame, lbl, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, clr, 2)
-                            
-                            # BAGO: I-save ang bawat frame sa buffer habang tumatakbo ang timer!
-                            if d["t_start"] is not None and not d.get("snapshot_saved"):
-                                # Limitahan sa 300 frames para hindi mapuno ang RAM ng laptop
-                                if len(d["video_buffer"]) < 300: 
-                                    d["video_buffer"].append(frame.copy())
-                            
-                            # --- BAGO: VIDEO RECORD TRIGGER ---
-                            if d["is_t"] and d["t_start"] is not None and (current_time - d["t_start"]) >= 7:
-                                if not d.get("snapshot_saved"):
-                                    import os, datetime
-                                    
-                                    abs_folder = os.path.abspath("violations")
-                                    if not os.path.exists(abs_folder): 
-                                        os.makedirs(abs_folder)
-                                    
-                                    date_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                                    room_clean = cam['room_name'].replace(' ', '_')
-                                    # Pinalitan natin ng .avi imbes na .jpg
-                                    filename = f"violation_{room_clean}_std{sid}_{date_str}.avi" 
-                                    full_filepath = os.path.join(abs_folder, filename)
-                                    
-                                    # I-compile ang mga naipong frames at i-save bilang Video!
-                                    if len(d["video_buffer"]) > 0:
-                                        h_frame, w_frame = d["video_buffer"][0].shape[:2]
-                                        # 10.0 FPS para sakto sa speed ng AI monitoring
-                                        out = cv2.VideoWriter(full_filepath, cv2.VideoWriter_fourcc(*'XVID'), 10.0, (w_frame, h_frame))
-                                        for bf in d["video_buffer"]:
-                                            out.write(bf)
-                                        out.release()
-                                    
-                                    # Ipasok sa Database!
-                                    from sems_db import Database
-                                    db = Database()
-                                    # BAGO: Ipinasa natin yung context string!
-                                    violation_context = " Student Looking Around (7s)"
-                                    db.insert_violation(cam['room_name'], cam['type'], violation_context, datetime.datetime.now().strftime("%Y-%m-%d %I:%M %p"), full_filepath)
-                                    
-                                    # I-update ang Reports Table nang live!
-                                    self.reports_frame.add_report_entry()
-                                    
-                                    d["snapshot_saved"] = True
-                                    d["video_buffer"] = [] # Linisin ang memory pagkatapos mag-save
-
-                            new_f[sid] = d
-                    cam["tracked_faces"] = new_f
-
-               # =========================================================================
-                # ROOM DECORUM LOGIC (MobileNet-SSD Body + MediaPipe Skeleton)
-                # =========================================================================
-                elif cam["type"] == "Room Decorum":
-                    roi_y = int(ih * 0.20)  # Red Line (Restricted Zone)
-                    seat_limit_y = int(ih * 0.40) # Yellow Line (Para sa limit ng upo)
-                    
-                    cv2.line(frame, (0, roi_y), (iw, roi_y), (0, 0, 255), 2)
-                    cv2.putText(frame, "RESTRICTED ZONE", (10, roi_y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-                    cv2.line(frame, (0, seat_limit_y), (iw, seat_limit_y), (0, 255, 255), 1)
-
-                    if "decorum_state" not in cam: 
-                        cam["decorum_state"] = {
-                            "continuous_start": None, 
-                            "burst_start": None,
-                            "is_burst_locked": False,
-                            "snapshot_saved": False,
-                            "video_buffer": [], 
-                            "current_v_name": ""
-                        }
-                    
-                    ds = cam["decorum_state"]
-
-                    is_continuous_v = False
-                    is_burst_v = False
-                    violation_detected = ""
-
-                    # A. MobileNet-SSD (Multiple People Tracking - Area & Seating)
-                    if person_net:
-                        blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 0.007843, (300, 300), 127.5)
-                        person_net.setInput(blob)
-                        dets = person_net.forward()
-                        for i in range(dets.shape[2]):
-                            conf = dets[0, 0, i, 2]
-                            
-                            # Confidence set at 0.20
-                            if int(dets[0, 0, i, 1]) == 15 and conf > 0.20: 
-                                box = dets[0, 0, i, 3:7] * np.array([iw, ih, iw, ih])
-                                sx, sy, ex, ey = box.astype("int")
-                                
-                                sx, sy = max(0, sx), max(0, sy)
-                                ex, ey = min(iw, ex), min(ih, ey)
-                                bw, bh = ex - sx, ey - sy
-                                
-                                if bw > 30 and bh > 50:
-                                    cv2.rectangle(frame, (sx, sy), (ex, ey), (0, 255, 0), 2)
-                                    cv2.putText(frame, f"Student {int(conf*100)}%", (sx, sy-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                                    
-                                    # --- BAGO: RESTRICTED AREA CHECK (Gamit ang Green Box) ---
-                                    if sy < roi_y:
-                                        is_continuous_v = True
-                                        violation_detected = "Restricted Area Access"
-                                    
-                                    # --- IMPROPER SEATING CHECK ---
-                                    # Kung hindi umabot sa red line pero lumampas sa yellow line
-                                    elif sy < seat_limit_y:
-                                        is_continuous_v = True
-                                        violation_detected = "Improper Seating Detected"
-
-                    # B. Skeletal Tracking (MediaPipe Pose - PARA SA FIGHTING/VELOCITY NALANG)
-                    if cam["pose_detector"]:
-                        rgb_decor = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        res_decor = cam["pose_detector"].process(rgb_decor)
-                        
-                        if res_decor.pose_landmarks:
-                            mp_drawing.draw_landmarks(frame, res_decor.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-                            lm = res_decor.pose_landmarks.landmark
-                            
-                            # Tinanggal na natin dito yung Restricted Area check!
-                            
-                            # --- HIGH-VELOCITY CHECK (Kamay lang) ---
-                            current_l_wrist = np.array([lm[15].x, lm[15].y])
-                            current_r_wrist = np.array([lm[16].x, lm[16].y])
-                            
-                            if "prev_wrists" in ds and ds["prev_wrists"] is not None:
-                                prev_l_wrist, prev_r_wrist = ds["prev_wrists"]
-                                dist_l = np.linalg.norm(current_l_wrist - prev_l_wrist)
-                                dist_r = np.linalg.norm(current_r_wrist - prev_r_wrist)
-                                
-                                if dist_l > 0.50 or dist_r > 0.65:
-                                    is_burst_v = True
-                                    violation_detected = "High-Velocity Commotion (Fighting)"
-                            
-                            ds["prev_wrists"] = (current_l_wrist, current_r_wrist)
-  
-                    # =======================================================
-                    # C. DUAL-LOGIC TIMER & VIDEO SAVING
-                    # =======================================================
-                    
-                    # 1. FIGHTING LOGIC (Burst & Locked)
-                    if is_burst_v and not ds["is_burst_locked"]:
-                        ds["is_burst_locked"] = True
-                        ds["burst_start"] = current_time
-                        ds["video_buffer"] = []
-                        ds["current_v_name"] = violation_detected
-
-                    if ds["is_burst_locked"]:
-                        elap = current_time - ds["burst_start"]
-                        cv2.putText(frame, f"[RECORDING] {ds['current_v_name']} ({int(5-elap)}s)", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                        
-                        if len(ds["video_buffer"]) < 300:
-                            ds["video_buffer"].append(frame.copy())
-
-                        if elap >= 5:
-                            import os, datetime
-                            abs_folder = os.path.abspath("violations")
-                            if not os.path.exists(abs_folder): os.makedirs(abs_folder)
-                            date_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                            full_filepath = os.path.join(abs_folder, f"decorum_{cam['room_name'].replace(' ', '_')}_{date_str}.avi")
-                            
-                            if len(ds["video_buffer"]) > 0:
-                                h_f, w_f = ds["video_buffer"][0].shape[:2]
-                                out = cv2.VideoWriter(full_filepath, cv2.VideoWriter_fourcc(*'XVID'), 10.0, (w_f, h_f))
-                                for bf in ds["video_buffer"]: out.write(bf)
-                                out.release()
-                            
-                            from sems_db import Database
-                            db = Database()
-                            db.insert_violation(cam['room_name'], cam['type'], ds['current_v_name'], datetime.datetime.now().strftime("%Y-%m-%d %I:%M %p"), full_filepath)
-                            self.reports_frame.add_report_entry()
-                            
-                            ds["is_burst_locked"] = False
-                            ds["burst_start"] = None
-                            ds["video_buffer"] = []
-
-                    # 2. AREA & SEATING LOGIC (Continuous) 
-                    elif not ds["is_burst_locked"]: 
-                        if is_continuous_v:
-                            if ds["continuous_start"] is None:
-                                ds["continuous_start"] = current_time
-                                ds["video_buffer"] = []
-                                ds["snapshot_saved"] = False
-                                ds["current_v_name"] = violation_detected
-                            
-                            elap = current_time - ds["continuous_start"]
-                            
-                            if elap >= 5:
-                                cv2.putText(frame, f"{ds['current_v_name']} Violation!", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 3)
-                            else:
-                                cv2.putText(frame, f"Warning: {ds['current_v_name']} ({int(5-elap)}s)", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-                            
-                            if not ds.get("snapshot_saved", False) and len(ds["video_buffer"]) < 300:
-                                ds["video_buffer"].append(frame.copy())
-                                
-                            if elap >= 5 and not ds.get("snapshot_saved", False):
-                                import os, datetime
-                                abs_folder = os.path.abspath("violations")
-                                if not os.path.exists(abs_folder): os.makedirs(abs_folder)
-                                date_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                                full_filepath = os.path.join(abs_folder, f"decorum_{cam['room_name'].replace(' ', '_')}_{date_str}.avi")
-                                
-                                if len(ds["video_buffer"]) > 0:
-                                    h_f, w_f = ds["video_buffer"][0].shape[:2]
-                                    out = cv2.VideoWriter(full_filepath, cv2.VideoWriter_fourcc(*'XVID'), 10.0, (w_f, h_f))
-                                    for bf in ds["video_buffer"]: out.write(bf)
-                                    out.release()
-                                
-                                from sems_db import Database
-                                db = Database()
-                                db.insert_violation(cam['room_name'], cam['type'], f"{ds['current_v_name']} (5s)", datetime.datetime.now().strftime("%Y-%m-%d %I:%M %p"), full_filepath)
-                                self.reports_frame.add_report_entry()
-                                
-                                ds["snapshot_saved"] = True
-                                ds["video_buffer"] = []
-                        else:
-                            ds["continuous_start"] = None
-                            ds["snapshot_saved"] = False
-                            ds["video_buffer"] = []
-
-                # --- ACTUAL VIDEO RECORDING CAPTURE ---
-                # BAGO: Kapag naka-on ang recording, ise-save niya yung frame (kasama green boxes) sa .avi file!
-                if cam.get("is_recording") and cam.get("video_writer"):
-                    cam["video_writer"].write(frame)
-
-                # --- Final Render to Dashboard ---
-                if self.fullscreen_cam_data == cam:
-                    self.render_video(frame, self.fs_video_label)
-                elif not self.fullscreen_cam_data:
-                    self.render_video(frame, cam["label"])
-                    
-        self.after(10, self.update_loop)
-
-    def render_video(self, frame, label):
+            qos = cam.get("qos", "hidden")
+            if qos == "focus":
+                label = self.fs_video_label
+            elif qos == "visible":
+                label = cam["label"]
+            else:
+                cam["render_size"] = None # Hindi nakikita, wag nang i-render ng worker
+                continue
+
+            cam["render_size"] = self.get_render_size(label)
+            img = cam["worker"].latest_image()
+            if img is not None:
+                self.render_image(img, label)
+
+        # Health ng camera sa card (isang beses kada 0.5s lang, hindi kada tick)
+        if time.time() - self.last_health_update > 0.5:
+            self.last_health_update = time.time()
+            self.update_health_labels()
+
+        self.after(15, self.update_loop)
+
+    def update_qos(self):
+        # --- QoS SCHEDULER ---
+        # focus   = naka-fullscreen (full rate)
+        # visible = tile na nakikita sa scrollable grid (reduced rate)
+        # hidden  = naka-scroll palabas, ibang tab, o may ibang naka-fullscreen (grab-only + minimum cadence)
+        fs_shown = self.fullscreen_frame.winfo_ismapped()
+        grid_shown = self.dashboard_frame.winfo_ismapped()
+
+        canvas = getattr(self.scroll, "_parent_canvas", self.scroll)
+        view_top = canvas.winfo_rooty()
+        view_bottom = view_top + canvas.winfo_height()
+
+        for cam in self.active_cameras:
+            if fs_shown and cam is self.fullscreen_cam_data:
+                qos = "focus"
+            elif grid_shown:
+                card_top = cam["card"].winfo_rooty()
+                card_bottom = card_top + cam["card"].winfo_height()
+                qos = "visible" if card_bottom > view_top and card_top < view_bottom else "hidden"
+            else:
+                qos = "hidden"
+            cam["qos"] = qos
+
+    def update_health_labels(self):
+        for cam in self.active_cameras:
+            status = cam["stream"].status
+            text, color = HEALTH_STYLES.get(status, (status.upper(), "#aaaaaa"))
+            text = f"● {text}"
+            if status == "live":
+                text += f"  {cam['worker'].fps:.0f} fps"
+                text += f"  {cam['worker'].skip_ratio() * 100:.0f}% idle"
+            if cam["worker"].inference_stalled:
+                text += "  ⚠ AI not responding"
+                color = HEALTH_STYLES["stalled"][1]
+            if cam["worker"].clips_dropped:
+                text += f"  ⚠ {cam['worker'].clips_dropped} clip(s) dropped"
+            if text != cam["status_text"]:
+                cam["status_text"] = text
+                cam["status_label"].configure(text=text, text_color=color)
+
+    def get_render_size(self, label):
+        tw, th = label.winfo_width(), label.winfo_height()
+        if tw < 100: tw, th = 280, 180
+        return tw, th
+
+    def render_image(self, img, label):
         try:
-            tw, th = label.winfo_width(), label.winfo_height()
-            if tw < 100: tw, th = 280, 180
-            
-            # --- FORCE ALL-ZOOM (Removes Black Letterboxing) ---
-            resized = cv2.resize(frame, (tw, th), interpolation=cv2.INTER_AREA)
-            img = Image.fromarray(cv2.cvtColor(resized, cv2.COLOR_BGR2RGB))
-            ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=(tw, th))
+            # --- FORCE ALL-ZOOM (Naka-resize na galing sa worker) ---
+            ctk_img = ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
             label.configure(image=ctk_img, text="")
             label.image = ctk_img
         except: pass
@@ -660,14 +321,14 @@ class SEMSDashboard(ctk.CTk):
 
     def remove_camera(self, cam_data):
         # BAGO: Burahin din sa Database!
-        from sems_db import Database
-        db = Database()
-        db.delete_camera_by_name(cam_data["room_name"])
-        db.close()
-
-        cam_data["stream"].stop()
-        if cam_data["face_detector"]: cam_data["face_detector"].close()
-        if cam_data["pose_detector"]: cam_data["pose_detector"].close()
+        from sems_db import get_db
+        get_db().delete_camera_by_name(cam_data["room_name"])
+
+        # Ang worker na ang nagsasara ng analyzer pagkatapos ng huling frame niya
+        self.pipeline.remove_camera(cam_data)
+        for s in self.camera_streams(cam_data):
+            self.stream_supervisor.unwatch(s)
+            s.stop()
         cam_data["card"].destroy()
         self.active_cameras.remove(cam_data)
         
@@ -677,12 +338,20 @@ class SEMSDashboard(ctk.CTk):
             cam["card"].grid(row=row, column=col, padx=12, pady=12, sticky="nsew")
 
     def on_closing(self):
+        self.pipeline.stop()
+        self.stream_supervisor.stop()
+        self.reconciler.stop()
+        # Huli ang database: isusulat muna ang mga nakapilang violation/recording rows
+        from sems_db import get_db
+        get_db().stop()
         for cam in self.active_cameras: 
-            cam["stream"].stop()
-            if cam["face_detector"]: cam["face_detector"].close()
-            if cam["pose_detector"]: cam["pose_detector"].close()
+            for s in self.camera_streams(cam):
+                s.stop()
         self.destroy()
 
+    def camera_streams(self, cam):
+        return [s for s in (cam["stream"], cam.get("main_stream")) if s is not None]
+
     def open_add_local_popup(self): 
         # Kung may bukas nang popup, isara muna
         if hasattr(self, 'active_popup') and self.active_popup is not None and self.active_popup.winfo_exists():
@@ -1,18 +1,95 @@
 import customtkinter as ctk
-import cv2
-from PIL import Image
 import os
+import queue
+import tkinter
 from tkinter import messagebox
-from sems_db import Database
+from sems_db import get_db, display_timestamp
+from sems_thumbnails import get_thumbnails, THUMBNAIL_SIZE
+from sems_player import remove_index
+from sems_timeline import remove_events
+from clip_player1 import ClipPlayerWindow
+from sems_config import REPLAY_COLUMNS, REPLAY_ROW_HEIGHT, REPLAY_PAGE_SIZE, REPORTS_SEARCH_DEBOUNCE_MS
+
+
+class ReplayCard:
+    # Isang card sa virtualized grid. Ginagawa nang isang beses lang; bind_record() ang
+    # nagpapalit ng laman kapag nag-scroll o nag-search.
+    def __init__(self, owner, slot):
+        self.owner = owner
+        self.slot = slot
+        self.db_id = None
+        self.file_path = None
+        self.waiting = False
+
+        self.frame = ctk.CTkFrame(owner.grid_frame, fg_color="#252526", corner_radius=12)
+        self.thumb_label = ctk.CTkLabel(self.frame, text="", fg_color="black", width=280, height=160, corner_radius=8)
+        self.thumb_label.pack(padx=10, pady=(10, 5))
+        self.thumb_label.bind("<Button-1>", lambda e: self.file_path and owner.play_video(self.file_path))
+
+        info_frame = ctk.CTkFrame(self.frame, fg_color="transparent")
+        info_frame.pack(fill="x", padx=10, pady=(0, 10))
+
+        text_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
+        text_frame.pack(side="left", fill="x", expand=True)
+
+        self.room_label = ctk.CTkLabel(text_frame, text="", font=("Segoe UI", 14, "bold"))
+        self.room_label.pack(anchor="w")
+        self.date_label = ctk.CTkLabel(text_frame, text="", font=("Segoe UI", 11), text_color="#aaaaaa")
+        self.date_label.pack(anchor="w")
+
+        # BAGO: Checkbox imbes na maliit na 'X' button
+        self.checkbox = ctk.CTkCheckBox(info_frame, text="", width=24, command=lambda: self.db_id is not None and owner.toggle_select(self.db_id, self.file_path))
+        self.checkbox.pack(side="right", padx=(5, 0))
+
+    def bind_record(self, rec):
+        db_id, room, cam_type, date_time, file_path = rec
+        # 4 na column para maganda spacing sa Full Screen; sticky="n" para hindi ma-stretch
+        self.frame.grid(row=self.slot // REPLAY_COLUMNS, column=self.slot % REPLAY_COLUMNS, padx=15, pady=15, sticky="n")
+        if db_id in self.owner.selected_records: self.checkbox.select()
+        else: self.checkbox.deselect()
+        if db_id == self.db_id: return
+        self.db_id, self.file_path = db_id, file_path
+        self.room_label.configure(text=room)
+        self.date_label.configure(text=display_timestamp(date_time))
+
+        # Walang video decode dito: cache lookup lang, ang iba ay gagawin sa background
+        pil_img = self.owner.thumbnails.request(file_path)
+        if pil_img:
+            self.set_thumbnail(pil_img)
+        else:
+            self.waiting = True
+            self.thumb_label.configure(image=None, text="Loading...")
+            self.thumb_label.image = None
+            self.owner.wait_for_thumbnail(file_path)
+
+    def set_thumbnail(self, pil_img):
+        self.waiting = False
+        if pil_img:
+            img_ctk = ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=THUMBNAIL_SIZE)
+            self.thumb_label.configure(image=img_ctk, text="")
+            self.thumb_label.image = img_ctk
+        else:
+            self.thumb_label.configure(image=None, text="No Preview")
+            self.thumb_label.image = None
+
+    def hide(self):
+        self.frame.grid_remove()
+        self.db_id = self.file_path = None
+        self.waiting = False
+
 
 class ReplaySystemFrame(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
         self.configure(fg_color="transparent")
-        self.db = Database()
+        self.db = get_db()
 
-        # Set para i-store kung aling mga video ID ang naka-check
-        self.selected_records = set()
+        # Aling mga video ID ang naka-check (db_id -> file_path, para hindi na kailangang i-query ulit sa delete)
+        self.selected_records = {}
+
+        # Thumbnails galing sa persistent cache; ang wala pa ay "Loading..." hanggang matapos ang background decode
+        self.thumbnails = get_thumbnails()
+        self.thumb_poll_job = None
 
         # --- HEADER SECTION ---
         header = ctk.CTkFrame(self, fg_color="transparent")
@@ -34,96 +111,192 @@ class ReplaySystemFrame(ctk.CTkFrame):
         self.search_entry.pack(side="left")
         self.search_entry.bind("<KeyRelease>", self.search_records)
 
-        # --- MAIN SCROLLABLE CONTAINER ---
-        self.scroll_frame = ctk.CTkScrollableFrame(self, fg_color="transparent")
-        self.scroll_frame.pack(expand=True, fill="both", padx=20, pady=10)
-        
+        # --- VIRTUALIZED CARD GRID ---
+        # Hindi na gumagawa ng card kada recording: may maliit na pool ng cards para sa mga
+        # row na nakikita lang, at nirere-bind sila sa ibang recording habang nagso-scroll
+        grid_container = ctk.CTkFrame(self, fg_color="transparent")
+        grid_container.pack(expand=True, fill="both", padx=20, pady=10)
+
+        self.scrollbar = ctk.CTkScrollbar(grid_container, orientation="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.grid_frame = ctk.CTkFrame(grid_container, fg_color="transparent")
+        self.grid_frame.pack(side="left", expand=True, fill="both")
         # BAGO: Ginawang 4 Columns at naka-center ang distribute ng space
-        self.scroll_frame.grid_columnconfigure((0, 1, 2, 3), weight=1)
+        self.grid_frame.grid_columnconfigure(tuple(range(REPLAY_COLUMNS)), weight=1)
+        self.grid_frame.bind("<Configure>", self.on_grid_resize)
+
+        # BAGO: Centered Empty Label
+        self.empty_label = ctk.CTkLabel(self.grid_frame, text="No recorded monitoring yet.", font=("Segoe UI", 16), text_color="#777777")
+        self.bind_wheel(self.grid_frame)
+
+        # --- DATA MODEL ---
+        # Hindi na buong table ang nasa memory: COUNT para sa scrollbar, at LIMIT/OFFSET pages
+        # sa paligid ng nakikitang rows (pareho sa Reports view)
+        self.search_query = ""
+        self.search_job = None
+        self.total_records = 0
+        self.cache = {}      # index sa kasalukuyang search -> record
+        self.first_row = 0
+        self.visible_rows = 2
+        self.cards = []      # Pool ng ReplayCard (visible_rows x 4)
 
         self.load_from_db()
 
     def load_from_db(self, search_query=""):
         # I-clear ang mga na-check na boxes tuwing nagre-refresh
         self.selected_records.clear()
+        self.apply_filter(search_query)
 
-        # Linisin muna ang loob ng scroll frame
-        for widget in self.scroll_frame.winfo_children():
-            widget.destroy()
-
-        records = self.db.fetch_all()
-        
-        # Filter kung may tinype sa search bar
-        if search_query:
-            records = [rec for rec in records if search_query in str(rec[1]).lower()]
-
-        # BAGO: Centered Empty Label (Ginamit ang grid at columnspan=4 para gitnang-gitna!)
-        if not records:
-            empty_label = ctk.CTkLabel(self.scroll_frame, text="No recorded monitoring yet.", font=("Segoe UI", 16), text_color="#777777")
-            empty_label.grid(row=0, column=0, columnspan=4, pady=150, sticky="nsew") 
-            return
+    def apply_filter(self, search_query):
+        # COUNT lang dito; ang records ay kinukuha kada page sa render_rows()
+        self.search_query = search_query
+        self.first_row = 0
+        self.refresh()
 
-        # Gumawa ng cards para sa bawat video
-        for index, rec in enumerate(records):
-            db_id, room, cam_type, date_time, file_path = rec
-            self.create_video_card(db_id, room, date_time, file_path, index)
+    def refresh(self):
+        self.total_records = self.db.count_recordings(room_search=self.search_query or None)
+        self.cache.clear()
+        self.render_rows()
 
     def search_records(self, event=None):
+        # Debounce gaya ng Reports: sa huling pindot lang tatakbo ang COUNT + page query
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(REPORTS_SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
         query = self.search_entry.get().lower()
-        self.load_from_db(search_query=query)
+        if query != self.search_query:
+            self.apply_filter(query)
+
+    def fetch_range(self, start, count):
+        # Siguraduhing naka-cache ang [start, start + count); isang LIMIT/OFFSET query lang kung may kulang
+        end = min(start + count, self.total_records)
+        missing = [i for i in range(start, end) if i not in self.cache]
+        if missing:
+            offset = missing[0] // REPLAY_PAGE_SIZE * REPLAY_PAGE_SIZE
+            limit = -(-(missing[-1] + 1 - offset) // REPLAY_PAGE_SIZE) * REPLAY_PAGE_SIZE
+            rows = self.db.query_recordings(room_search=self.search_query or None, limit=limit, offset=offset)
+            for i, rec in enumerate(rows):
+                self.cache[offset + i] = rec
+            if len(rows) < limit: self.total_records = min(self.total_records, offset + len(rows))
+        # Bounded ang cache: itapon ang malayo sa nakikita
+        lo, hi = start - 2 * REPLAY_PAGE_SIZE, end + 2 * REPLAY_PAGE_SIZE
+        for i in [i for i in self.cache if i < lo or i >= hi]:
+            del self.cache[i]
+        return [self.cache[i] for i in range(start, min(end, self.total_records)) if i in self.cache]
+
+    def remove_records(self, db_ids):
+        # Galing sa GhostReconciler: bilang + kasalukuyang page lang ang kinukuha ulit
+        for db_id in db_ids:
+            self.selected_records.pop(db_id, None)
+        self.refresh()
 
     def add_recorded_video(self, db_id, room, start_date, saved_filepath):
-        self.search_entry.delete(0, 'end')
-        self.load_from_db()
+        # Bagong segment: pinakabago ito, kaya nasa unahan ng listahan (ORDER BY date_time DESC).
+        # Inuusog lang ang cache; hindi na nire-reload ang lahat o binubura ang search.
+        if self.search_query not in str(room).lower(): return
+        if any(rec[0] == db_id for rec in self.cache.values()): return # Kasama na sa huling query
+        newest = self.cache.get(0)
+        if newest is not None and str(newest[3]) > str(start_date):
+            self.refresh() # Hindi pinakabago (hal. naantalang segment), kunin na lang ulit ang page
+            return
+        self.cache = {i + 1: rec for i, rec in self.cache.items()}
+        self.cache[0] = (db_id, room, None, start_date, saved_filepath)
+        self.total_records += 1
+        self.render_rows()
 
     # BAGO: Logic para mag-add/remove ng db_id kapag kiniclick ang Checkbox
-    def toggle_select(self, db_id):
+    def toggle_select(self, db_id, file_path):
         if db_id in self.selected_records:
-            self.selected_records.remove(db_id)
+            del self.selected_records[db_id]
         else:
-            self.selected_records.add(db_id)
+            self.selected_records[db_id] = file_path
 
-    def create_video_card(self, db_id, room, date_time, file_path, index):
-        # 4 na column para maganda spacing sa Full Screen
-        row = index // 4
-        col = index % 4
-        
-        card = ctk.CTkFrame(self.scroll_frame, fg_color="#252526", corner_radius=12)
-        # BAGO: sticky="n" keeps it centered horizontally in its column, no more stretching!
-        card.grid(row=row, column=col, padx=15, pady=15, sticky="n")
-        
-        img_ctk = None
-        if os.path.exists(file_path):
-            cap = cv2.VideoCapture(file_path)
-            ret, frame = cap.read()
-            cap.release()
-            if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frame = cv2.resize(frame, (280, 160))
-                pil_img = Image.fromarray(frame)
-                img_ctk = ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=(280, 160))
-
-        thumb_label = ctk.CTkLabel(card, text="No Preview" if not img_ctk else "", image=img_ctk, fg_color="black", width=280, height=160, corner_radius=8)
-        thumb_label.pack(padx=10, pady=(10, 5))
-        thumb_label.bind("<Button-1>", lambda e, p=file_path: self.play_video(p))
-        
-        info_frame = ctk.CTkFrame(card, fg_color="transparent")
-        info_frame.pack(fill="x", padx=10, pady=(0, 10))
-        
-        text_frame = ctk.CTkFrame(info_frame, fg_color="transparent")
-        text_frame.pack(side="left", fill="x", expand=True)
-        
-        ctk.CTkLabel(text_frame, text=room, font=("Segoe UI", 14, "bold")).pack(anchor="w")
-        ctk.CTkLabel(text_frame, text=date_time, font=("Segoe UI", 11), text_color="#aaaaaa").pack(anchor="w")
-        
-        # BAGO: Checkbox imbes na maliit na 'X' button
-        checkbox = ctk.CTkCheckBox(info_frame, text="", width=24, command=lambda id=db_id: self.toggle_select(id))
-        checkbox.pack(side="right", padx=(5, 0))
+    # --- VIRTUAL SCROLLING ---
+    def total_rows(self):
+        return (self.total_records + REPLAY_COLUMNS - 1) // REPLAY_COLUMNS
+
+    def on_grid_resize(self, event):
+        rows = max(1, -(-event.height // REPLAY_ROW_HEIGHT)) # ceil: kasama ang bahagyang nakikitang row
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render_rows()
+
+    def scroll_to(self, row):
+        row = max(0, min(row, self.total_rows() - self.visible_rows + 1))
+        if row != self.first_row:
+            self.first_row = row
+            self.render_rows()
+
+    def on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(value) * self.total_rows()))
+        elif action == "scroll":
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.first_row + int(value) * step)
+
+    def bind_wheel(self, widget):
+        # Direkta sa grid at sa bawat widget ng card (hindi bind_all, para hindi maagaw ang
+        # scroll ng ibang CTkScrollableFrame). Button-4/5 ang wheel sa Linux.
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tkinter.Misc.bind(widget, sequence, self.on_mousewheel, "+")
+        for child in widget.winfo_children():
+            self.bind_wheel(child)
+
+    def on_mousewheel(self, event):
+        up = event.num == 4 or (event.num != 5 and event.delta > 0)
+        self.scroll_to(self.first_row + (-1 if up else 1))
+
+    def render_rows(self):
+        # Gumawa lang ng cards na kulang sa pool (isang beses), tapos i-bind sa kasalukuyang rows
+        needed = self.visible_rows * REPLAY_COLUMNS
+        while len(self.cards) < needed:
+            card = ReplayCard(self, len(self.cards))
+            self.bind_wheel(card.frame)
+            self.cards.append(card)
+
+        start = self.first_row * REPLAY_COLUMNS
+        records = self.fetch_range(start, needed)
+        for i, card in enumerate(self.cards):
+            if i < needed and i < len(records):
+                card.bind_record(records[i])
+            else:
+                card.hide()
+
+        if self.total_records:
+            self.empty_label.grid_remove()
+        else:
+            self.empty_label.grid(row=0, column=0, columnspan=REPLAY_COLUMNS, pady=150, sticky="nsew")
+
+        total = max(1, self.total_rows())
+        self.scrollbar.set(self.first_row / total, min(1.0, (self.first_row + self.visible_rows) / total))
+
+    def wait_for_thumbnail(self, file_path):
+        if self.thumb_poll_job is None:
+            self.thumb_poll_job = self.after(100, self.poll_thumbnails)
+
+    def poll_thumbnails(self):
+        # Ilagay ang mga natapos na thumbnails sa card na naka-bind pa sa video na iyon
+        # (Tk thread lang ang gumagalaw sa widgets)
+        self.thumb_poll_job = None
+        while True:
+            try:
+                file_path, pil_img = self.thumbnails.ready.get_nowait()
+            except queue.Empty:
+                break
+            for card in self.cards:
+                if card.file_path == file_path and card.waiting:
+                    card.set_thumbnail(pil_img)
+        if any(card.waiting for card in self.cards):
+            self.thumb_poll_job = self.after(100, self.poll_thumbnails)
 
     def play_video(self, file_path):
         abs_path = os.path.abspath(file_path)
         if os.path.exists(abs_path):
-            os.startfile(abs_path)
+            ClipPlayerWindow(self, abs_path, "Recording")
         else:
             messagebox.showerror("Error", f"Video file not found:\n{abs_path}")
 
@@ -135,19 +308,22 @@ class ReplaySystemFrame(ctk.CTkFrame):
 
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {len(self.selected_records)} selected recording(s)?"):
             
-            # Kukunin lahat ng records tapos hahanapin yung mga nag-match sa na-check mo
-            records = self.db.fetch_all()
-            for rec in records:
-                db_id, _, _, _, file_path = rec
-                
-                if db_id in self.selected_records:
-                    # Burahin sa DB
-                    self.db.delete_record(db_id)
-                    # Burahin yung mismong .avi file
-                    abs_path = os.path.abspath(file_path)
-                    if os.path.exists(abs_path):
-                        try: os.remove(abs_path)
-                        except: pass
+            # Hawak na ang file path ng bawat na-check (walang full table query)
+            records = list(self.selected_records.items())
+            # Burahin sa DB: isang request para sa lahat, isang beses lang hihintayin
+            try:
+                self.db.delete_records([db_id for db_id, _ in records]).wait()
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not delete the selected recording(s):\n{e}")
+                return
+            for _, file_path in records:
+                # Burahin yung mismong .avi file
+                abs_path = os.path.abspath(file_path)
+                if os.path.exists(abs_path):
+                    try: os.remove(abs_path)
+                    except: pass
+                    remove_index(abs_path)
+                    remove_events(abs_path)
             
             # I-reload yung UI pagkatapos burahin
             self.load_from_db(search_query=self.search_entry.get().lower())
\ No newline at end of file
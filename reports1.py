@@ -1,14 +1,34 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 import os
-from sems_db import Database
+import datetime
+from sems_db import get_db, display_timestamp, TIMESTAMP_FORMAT
+from sems_player import remove_index
+from clip_player1 import ClipPlayerWindow
+from sems_config import REPORTS_PAGE_SIZE, REPORTS_SEARCH_DEBOUNCE_MS
 
 class ReportsFrame(ctk.CTkFrame):
     def __init__(self, master, **kwargs):
         super().__init__(master, **kwargs)
         self.configure(fg_color="transparent")
         
-        self.db = Database()
+        self.db = get_db()
+
+        # --- SEARCH / PAGING STATE ---
+        self.search_query = ""
+        self.search_job = None
+        self.loaded_rows = 0
+        self.total_rows = 0
+        self.page_pending = False
+        # db_id ng bawat row na nasa table, para hindi madoble ang live row na kasama na sa page query
+        self.loaded_ids = set()
+
+        # --- LIVE ROWS (galing sa pipeline events) ---
+        self.pending_rows = []
+        self.flush_job = None
+        self.renumber_job = None
+        self.numbers_dirty = False
+        self.bind("<Map>", lambda e: self.renumber_if_dirty())
 
         # --- HEADER SECTION ---
         header = ctk.CTkFrame(self, fg_color="transparent")
@@ -33,6 +53,9 @@ class ReportsFrame(ctk.CTkFrame):
         self.search_entry.pack(side="left")
         self.search_entry.bind("<KeyRelease>", self.search_records)
 
+        self.count_label = ctk.CTkLabel(search_container, text="", font=("Segoe UI", 12), text_color="#aaaaaa")
+        self.count_label.pack(side="right")
+
         self.setup_table()
         self.load_from_db()
 
@@ -53,12 +76,15 @@ class ReportsFrame(ctk.CTkFrame):
         tree_scroll_x.pack(side="bottom", fill="x")
 
         # BAGO: Dinagdag ang "Room Type" sa columns
-        self.tree = ttk.Treeview(tree_frame, columns=("DB_ID", "No.", "Room Name", "Room Type", "Violation Type", "Date & Time", "File Path"), 
+        self.tree = ttk.Treeview(tree_frame, columns=("DB_ID", "No.", "Room Name", "Room Type", "Violation Type", "Date & Time", "File Path", "Timestamp"), 
                                  show='headings', 
                                  displaycolumns=("No.", "Room Name", "Room Type", "Violation Type", "Date & Time", "File Path"),
                                  yscrollcommand=tree_scroll_y.set, 
                                  xscrollcommand=tree_scroll_x.set)
         
+        # Kapag malapit na sa dulo ang scroll, ilo-load ang susunod na page
+        self.tree_scroll_y = tree_scroll_y
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
         tree_scroll_y.configure(command=self.tree.yview)
         tree_scroll_x.configure(command=self.tree.xview)
         
@@ -90,52 +116,101 @@ class ReportsFrame(ctk.CTkFrame):
             self.tree.selection_remove(self.tree.selection())
 
     def load_from_db(self):
+        # Bagong query mula sa simula (page 1), gamit ang kasalukuyang search
+        self.search_query = self.search_entry.get().strip().lower()
         for item in self.tree.get_children():
             self.tree.delete(item)
-            
-        records = self.db.fetch_all_violations()
-        display_index = 1
-        
+        self.loaded_rows = 0
+        self.loaded_ids = set()
+        # Kasama na sa bagong query ang mga live row na hindi pa naipapakita
+        self.pending_rows = []
+        if self.flush_job is not None:
+            self.after_cancel(self.flush_job)
+            self.flush_job = None
+        self.numbers_dirty = False
+        self.total_rows = self.db.count_violations(room_search=self.search_query or None)
+        self.load_next_page()
+
+    def load_next_page(self):
+        self.page_pending = False
+        if self.loaded_rows >= self.total_rows: return
+        # Walang filesystem check dito; ang GhostReconciler na ang nagbubura ng rows na wala nang video
+        records = self.db.query_violations(room_search=self.search_query or None, limit=REPORTS_PAGE_SIZE, offset=self.loaded_rows)
         for rec in records:
-            db_id = rec[0]
-            abs_path = os.path.abspath(str(rec[5]))
-            
-            # --- BAGO: AUTO-CLEANUP GHOST RECORDS ---
-            # Iche-check ng system kung totoong nasa folder pa yung video.
-            # Kung hindi nai-save o nabura sa folder, buburahin na rin niya sa Database!
-            if not os.path.exists(abs_path):
-                self.db.delete_violation(db_id)
-                continue # Laktawan at wag nang ipakita sa table
-                
-            # Kung nag-e-exist yung video, ilagay sa table
-            self.tree.insert("", "end", values=(db_id, display_index, rec[1], rec[2], rec[3], rec[4], rec[5]))
-            display_index += 1
+            if rec[0] in self.loaded_ids: continue
+            self.loaded_ids.add(rec[0])
+            self.loaded_rows += 1
+            self.tree.insert("", "end", values=(rec[0], self.loaded_rows, rec[1], rec[2], rec[3], display_timestamp(rec[4]), rec[5], rec[4]))
+        if not records: self.total_rows = self.loaded_rows
+        self.count_label.configure(text=f"Showing {self.loaded_rows} of {self.total_rows}")
+
+    def on_tree_scroll(self, first, last):
+        self.tree_scroll_y.set(first, last)
+        if float(last) > 0.9 and self.loaded_rows < self.total_rows and not self.page_pending:
+            self.page_pending = True
+            self.after_idle(self.load_next_page)
 
     def search_records(self, event=None):
-        search_query = self.search_entry.get().lower()
-        
-        for item in self.tree.get_children():
+        # Debounce: sa huling pindot lang tatakbo ang query, hindi kada letra
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(REPORTS_SEARCH_DEBOUNCE_MS, self.run_search)
+
+    def run_search(self):
+        self.search_job = None
+        if self.search_entry.get().strip().lower() != self.search_query:
+            self.load_from_db()
+
+    def add_report_entry(self, row=None):
+        # row = (db_id, room, cam_type, v_type, date_time, file_path) ng bagong violation.
+        # Walang row = buong reload (e.g. galing sa ibang bahagi ng app)
+        if row is None:
+            self.load_from_db()
+            return
+        self.pending_rows.append(row)
+        # Isang UI update lang para sa lahat ng sabay-sabay na violation
+        if self.flush_job is None:
+            self.flush_job = self.after_idle(self.flush_pending_rows)
+
+    def flush_pending_rows(self):
+        self.flush_job = None
+        rows, self.pending_rows = self.pending_rows, []
+        # Ang nasa search lang at wala pa sa table ang ipapakita (pwedeng nabasa na ito ng page query
+        # bago dumating ang event); pinakabago sa itaas (pareho sa ORDER BY ng query)
+        rows = [r for r in rows if self.search_query in str(r[1]).lower() and r[0] not in self.loaded_ids]
+        if not rows: return
+        for rec in sorted(rows, key=lambda r: (r[4], r[0])):
+            self.loaded_ids.add(rec[0])
+            self.tree.insert("", 0, values=(rec[0], "", rec[1], rec[2], rec[3], display_timestamp(rec[4]), rec[5], rec[4]))
+        self.loaded_rows += len(rows)
+        self.total_rows += len(rows)
+        self.count_label.configure(text=f"Showing {self.loaded_rows} of {self.total_rows}")
+
+        # Lazy renumber: hindi kada row, at hindi habang nakatago ang Reports
+        self.numbers_dirty = True
+        if self.renumber_job is None:
+            self.renumber_job = self.after(1000, self.renumber_if_dirty)
+
+    def remove_rows(self, db_ids):
+        # Galing sa GhostReconciler: tanggalin ang rows na nabura na sa database
+        db_ids = set(db_ids)
+        removed = [item for item in self.tree.get_children() if self.tree.item(item)['values'][0] in db_ids]
+        for item in removed:
             self.tree.delete(item)
-            
-        records = self.db.fetch_all_violations()
-        display_index = 1
-        
-        for rec in records:
-            db_id = rec[0]
-            abs_path = os.path.abspath(str(rec[5]))
-            
-            # --- BAGO: AUTO-CLEANUP GHOST RECORDS ---
-            if not os.path.exists(abs_path):
-                self.db.delete_violation(db_id)
-                continue
-                
-            room_name = str(rec[1]).lower()
-            if search_query in room_name:
-                self.tree.insert("", "end", values=(db_id, display_index, rec[1], rec[2], rec[3], rec[4], rec[5]))
-                display_index += 1
-    def add_report_entry(self):
-        self.search_entry.delete(0, 'end')
-        self.load_from_db()
+        self.loaded_ids -= db_ids
+        self.loaded_rows -= len(removed)
+        self.total_rows = max(self.loaded_rows, self.total_rows - len(db_ids))
+        self.count_label.configure(text=f"Showing {self.loaded_rows} of {self.total_rows}")
+        if removed:
+            self.numbers_dirty = True
+            self.renumber_if_dirty()
+
+    def renumber_if_dirty(self):
+        self.renumber_job = None
+        if not self.numbers_dirty or not self.winfo_ismapped(): return
+        self.numbers_dirty = False
+        for i, item in enumerate(self.tree.get_children(), start=1):
+            self.tree.set(item, "No.", i)
 
     def view_snapshot(self):
         selected = self.tree.selection()
@@ -147,7 +222,12 @@ class ReportsFrame(ctk.CTkFrame):
         abs_path = os.path.abspath(data[6]) # Updated index dahil na-move ang file path sa dulo
         
         if os.path.exists(abs_path):
-            os.startfile(abs_path) 
+            # Built-in player; tatalon diretso sa sandali ng violation
+            try:
+                start_clock = datetime.datetime.strptime(str(data[7]), TIMESTAMP_FORMAT).timestamp()
+            except ValueError:
+                start_clock = None
+            ClipPlayerWindow(self, abs_path, "Violation Evidence", start_clock=start_clock)
             self.tree.selection_remove(self.tree.selection())
         else:
             messagebox.showerror("Error", f"Video file not found at:\n{abs_path}")
@@ -160,21 +240,26 @@ class ReportsFrame(ctk.CTkFrame):
             return
             
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {len(selected_items)} selected violation(s)?"):
-            for item in selected_items:
-                data = self.tree.item(item)['values']
-                rec_id = data[0]
-                
+            rows = [self.tree.item(item)['values'] for item in selected_items]
+
+            # 1. Burahin muna sa Database: isang request para sa lahat, isang beses lang hihintayin
+            # (para hindi na lumabas sa reload)
+            try:
+                self.db.delete_violations([data[0] for data in rows]).wait()
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not delete the selected violation(s):\n{e}")
+                return
+
+            for data in rows:
                 # BAGO: Mas pinatibay na pagbasa ng file path
                 file_path = str(data[6]) 
                 abs_path = os.path.normpath(file_path)
                 
-                # 1. Burahin muna sa Database
-                self.db.delete_violation(rec_id)
-                
                 # 2. Burahin sa mismong "violations" folder
                 if os.path.exists(abs_path):
                     try: 
                         os.remove(abs_path)
+                        remove_index(abs_path)
                         print(f"SUCCESS: File Deleted -> {abs_path}")
                     except Exception as e: 
                         print(f"ERROR: {e}")
@@ -0,0 +1,152 @@
+import cv2
+import numpy as np
+import os
+import datetime
+import threading
+import queue
+import time
+from collections import deque
+
+from sems_config import (CLIP_BUFFER_SECONDS, CLIP_BUFFER_MAX_MB, CLIP_BUFFER_HARD_MAX_MB, CLIP_MAX_WIDTH,
+                         CLIP_JPEG_QUALITY, CLIP_WRITER_THREADS, CLIP_QUEUE_SIZE, CLIP_QUEUE_TIMEOUT)
+from sems_player import save_index
+
+
+class PreRollBuffer:
+    # Isang ring buffer kada camera ng mga huling segundo ng annotated frames, naka-JPEG sa memory.
+    # Dito kinukuha ang violation clips ayon sa oras, kaya kahit ilang estudyante ang sabay na
+    # nag-trigger ay may hangganan ang RAM ng camera. Ang budget ay nagsisimula sa max_bytes at
+    # sumusunod sa totoong bytes/second (hal. 1080p main stream) hanggang hard_max_bytes.
+    def __init__(self, max_seconds=CLIP_BUFFER_SECONDS, max_bytes=CLIP_BUFFER_MAX_MB * 1024 * 1024,
+                 hard_max_bytes=CLIP_BUFFER_HARD_MAX_MB * 1024 * 1024, quality=CLIP_JPEG_QUALITY, max_width=CLIP_MAX_WIDTH):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.hard_max_bytes = max(max_bytes, hard_max_bytes)
+        self.budget = max_bytes
+        self.max_width = max_width
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.entries = deque() # (timestamp, jpeg bytes)
+        self.size = 0
+        self.lock = threading.Lock()
+        self.last_warning = 0.0
+
+    def push(self, frame, timestamp, protect_since=None):
+        # protect_since = pinakamaagang oras na kailangan pa ng tumatakbong timer/clip; kapag
+        # napilitang itapon ang mas bago pa rito dahil sa memory, magwa-warning (mapuputol ang clip)
+        ih, iw = frame.shape[:2]
+        if self.max_width and iw > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(ih * self.max_width / iw)), interpolation=cv2.INTER_AREA)
+        ok, jpg = cv2.imencode(".jpg", frame, self.params)
+        if not ok: return
+        data = jpg.tobytes()
+        cut = 0
+        with self.lock:
+            self.entries.append((timestamp, data))
+            self.size += len(data)
+            span = timestamp - self.entries[0][0]
+            if span >= 1.0:
+                # Sapat para sa buong max_seconds sa kasalukuyang bytes/second (may 25% palugit)
+                needed = self.size / span * self.max_seconds * 1.25
+                self.budget = int(min(self.hard_max_bytes, max(self.max_bytes, needed)))
+            # Tanggalin ang luma: lampas sa oras o lampas sa memory budget
+            while self.entries and timestamp - self.entries[0][0] > self.max_seconds:
+                self.size -= len(self.entries.popleft()[1])
+            while self.entries and self.size > self.budget:
+                ts, old = self.entries.popleft()
+                self.size -= len(old)
+                if protect_since is not None and ts >= protect_since: cut += 1
+        if cut and time.time() - self.last_warning > 10.0:
+            self.last_warning = time.time()
+            print(f"WARNING: Pre-roll buffer full ({self.budget // (1024 * 1024)} MB), {cut} frame(s) of an active clip dropped")
+
+    def encoded_between(self, start, end):
+        # -> [(timestamp, jpeg bytes)] na nasa [start, end]; mura ito, decode ay sa clip writer na
+        with self.lock:
+            return [(ts, data) for ts, data in self.entries if start <= ts <= end]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+def decode_frames(encoded):
+    return [cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) for _, data in encoded]
+
+
+def clip_fps(encoded, default=10.0):
+    # Tunay na rate ng mga frame (nagbabago ayon sa QoS at motion gate) para tama ang bilis ng clip
+    if len(encoded) < 2: return default
+    span = encoded[-1][0] - encoded[0][0]
+    return max(1.0, min(30.0, (len(encoded) - 1) / span)) if span > 0 else default
+
+
+def save_violation_clip(frames, prefix, fps=10.0):
+    abs_folder = os.path.abspath("violations")
+    if not os.path.exists(abs_folder):
+        os.makedirs(abs_folder)
+
+    date_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    full_filepath = os.path.join(abs_folder, f"{prefix}_{date_str}.avi")
+
+    # I-compile ang mga naipong frames at i-save bilang Video!
+    if len(frames) > 0:
+        # Pwedeng halo ang substream at main stream frames; gamitin ang pinakamalaki
+        h_frame, w_frame = max((f.shape[:2] for f in frames), key=lambda s: s[0] * s[1])
+        # Default 10.0 FPS para sakto sa speed ng AI monitoring; pwedeng ibigay ang tunay na rate
+        out = cv2.VideoWriter(full_filepath, cv2.VideoWriter_fourcc(*'XVID'), fps, (w_frame, h_frame))
+        for bf in frames:
+            if bf.shape[:2] != (h_frame, w_frame):
+                bf = cv2.resize(bf, (w_frame, h_frame))
+            out.write(bf)
+        out.release()
+    return full_filepath
+
+
+class ClipWriterService:
+    # Taga-encode ng violation clips sa background threads. Ang camera worker ay naglalagay
+    # lang ng job (JPEG bytes mula sa pre-roll buffer) at tuloy agad sa susunod na frame.
+    # job = {"encoded", "prefix", "on_saved": callback(filepath)}
+    def __init__(self, num_threads=CLIP_WRITER_THREADS, max_jobs=CLIP_QUEUE_SIZE):
+        self.jobs = queue.Queue(maxsize=max_jobs)
+        self.max_jobs = max_jobs
+        self.dropped = 0
+        self.running = True
+        self.threads = [threading.Thread(target=self.run, daemon=True) for _ in range(max(1, num_threads))]
+        for t in self.threads: t.start()
+
+    def submit(self, job):
+        # Bounded: kapag puno, sandaling hintay lang tapos itatapon (hindi pwedeng ma-block ang live loop)
+        try:
+            self.jobs.put(job, timeout=CLIP_QUEUE_TIMEOUT)
+        except queue.Full:
+            self.dropped += 1
+            print(f"WARNING: Clip writer backlog full ({self.max_jobs} jobs), dropped clip {job['prefix']}")
+            return False
+        if self.backlog() >= self.max_jobs * 0.75:
+            print(f"WARNING: Clip writer falling behind ({self.backlog()}/{self.max_jobs} jobs queued)")
+        return True
+
+    def backlog(self):
+        return self.jobs.qsize()
+
+    def run(self):
+        while self.running:
+            try:
+                job = self.jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if job is None: break
+            try:
+                encoded = job["encoded"]
+                filepath = save_violation_clip(decode_frames(encoded), job["prefix"], clip_fps(encoded))
+                if encoded: save_index(filepath, [ts for ts, _ in encoded])
+                job["on_saved"](filepath)
+            except Exception as e:
+                print(f"ERROR: Failed to save violation clip {job['prefix']}: {e}")
+
+    def stop(self):
+        # Tapusin muna ang nakapilang clips bago isara ang app
+        for _ in self.threads: self.jobs.put(None)
+        for t in self.threads: t.join(timeout=10)
+        self.running = False
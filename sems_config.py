@@ -0,0 +1,161 @@
+import os
+
+# =========================================================================
+# SEMS PERFORMANCE SETTINGS
+# Pwedeng i-override gamit ang environment variables (e.g. SEMS_INFERENCE_MODE=process)
+# =========================================================================
+
+# --- Inference Workers ---
+# "thread"  = isang worker thread kada camera (default)
+# "process" = child processes na may sariling MobileNet/MediaPipe (gamit lahat ng cores)
+INFERENCE_MODE = os.environ.get("SEMS_INFERENCE_MODE", "thread")
+# Ilang child process ang gagamitin sa "process" mode (iniiwan ang isang core para sa UI)
+INFERENCE_PROCESSES = int(os.environ.get("SEMS_INFERENCE_PROCESSES", max(1, (os.cpu_count() or 2) - 1)))
+# Ilang frame slot sa shared memory ring ng bawat camera
+SHM_RING_SLOTS = 3
+# Max hintay (seconds) ng camera worker sa resulta ng child process bago ituring na "stalled"
+INFERENCE_TIMEOUT = 5.0
+# Habang stalled, maikling hintay lang kada frame para hindi ma-freeze ang camera card
+INFERENCE_STALL_POLL = 0.1
+
+# --- Batched MobileNet-SSD ---
+# Pinagsasama ang frames ng lahat ng camera sa isang forward pass
+SSD_BATCH_SIZE = int(os.environ.get("SEMS_SSD_BATCH_SIZE", 8))
+# Pinakamatagal na hintay (seconds) para mapuno ang batch bago mag-forward
+SSD_BATCH_MAX_WAIT = float(os.environ.get("SEMS_SSD_BATCH_MAX_WAIT", 0.02))
+
+# --- Video Capture ---
+# Ilang decoded frame slots ang umiikot sa bawat VideoStream (zero-copy handoff)
+FRAME_RING_SLOTS = 4
+# Kapag walang bagong frame nang ganito katagal (seconds), ituturing na "stalled" ang stream
+STREAM_STALL_TIMEOUT = 5.0
+# Exponential backoff (seconds) bago subukang buksan ulit ang camera
+RECONNECT_BACKOFF_MIN = 1.0
+RECONNECT_BACKOFF_MAX = 30.0
+# Sunod-sunod na failed read bago i-reconnect
+MAX_READ_FAILURES = 25
+# FFmpeg open/read timeout para hindi habambuhay naka-block ang cap.read() sa patay na RTSP
+CAPTURE_TIMEOUT_MSEC = 5000
+
+# --- Dual-Stream Capture (Tapo stream1 = main, stream2 = low-res substream) ---
+# Gaano katagal (seconds) pang bukas ang main stream pagkatapos ng huling recording/violation clip
+MAIN_STREAM_LINGER = 10.0
+# Hintay (seconds) sa main stream bago mag-fallback sa substream ang manual recording
+MAIN_STREAM_WARMUP = 5.0
+
+# --- QoS Scheduler (fullscreen > nakikitang tile > hidden) ---
+# Max processing rate ng nakikitang grid tile
+QOS_VISIBLE_FPS = 10
+# Minimum cadence ng hidden camera. Dapat mas mabilis sa 1 Hz dahil nabubura ang track
+# kapag hindi nakita nang 1.0s, para tuloy-tuloy pa rin ang 7s/5s violation timers.
+QOS_HIDDEN_FPS = 3
+
+# --- Detection Cadence (full detection kada N frames, optical flow tracking sa pagitan) ---
+# Kada ilang frame tatakbo ang MediaPipe face detection + MobileNet-SSD
+DETECTION_INTERVAL = int(os.environ.get("SEMS_DETECTION_INTERVAL", "3"))
+# Max tagal (seconds) na walang full detection, kahit mabagal ang QoS tier.
+# Dapat mas maikli sa 1.0s track expiry dahil detection lang ang nagre-refresh ng last_seen.
+DETECTION_MAX_AGE = 0.5
+# Kapag bumaba dito ang fraction ng maaasahang flow points, full detection agad sa susunod na frame
+TRACKER_MIN_CONFIDENCE = 0.5
+# Lapad ng grayscale frame na ginagamit ng optical flow
+FLOW_WIDTH = 320
+
+# --- Motion Gate (laktawan ang AI kapag walang gumagalaw sa classroom) ---
+# Lapad ng grayscale frame na ginagamit sa frame difference
+MOTION_WIDTH = 160
+# Pagbabago ng pixel (0-255) na ituturing na galaw
+MOTION_PIXEL_THRESHOLD = 25
+# Fraction ng frame na kailangang gumalaw bago patakbuhin ulit ang AI
+MOTION_MIN_AREA = float(os.environ.get("SEMS_MOTION_MIN_AREA", "0.002"))
+# Max tagal (seconds) na pwedeng laktawan ang AI kahit walang galaw
+MOTION_MAX_INTERVAL = 3.0
+
+# --- Violation Timing (pareho ang resulta kahit anong QoS tier / frame rate) ---
+# Turn smoothing: "nakatingin sa gilid" kapag lampas sa ratio na ito ng obserbasyon sa huling
+# ilang segundo (dating 7 sa huling 10 frames sa ~30 fps)
+TURN_SMOOTH_SECONDS = 0.33
+TURN_SMOOTH_RATIO = 0.6
+# Frame rate na pinagbatayan ng per-frame wrist velocity thresholds (0.50 / 0.65);
+# sini-scale ito sa totoong dt sa pagitan ng dalawang pose frames
+POSE_REFERENCE_FPS = 30.0
+
+# --- Exam Tracker ---
+# Max candidates (face + body boxes) kada detection. Dating 15; tinaas para sa 40+ na estudyante sa lecture hall
+EXAM_MAX_CANDIDATES = int(os.environ.get("SEMS_EXAM_MAX_CANDIDATES", "100"))
+
+# --- Violation Clips (pre-roll ring buffer kada camera, JPEG sa memory) ---
+# Ilang segundo bago magsimula ang timer at pagkatapos ng violation ang kasama sa clip
+CLIP_PRE_ROLL = float(os.environ.get("SEMS_CLIP_PRE_ROLL", "3.0"))
+CLIP_POST_ROLL = float(os.environ.get("SEMS_CLIP_POST_ROLL", "2.0"))
+# Haba ng buffer: pre-roll + pinakamahabang timer (7s) + post-roll, may palugit
+CLIP_BUFFER_SECONDS = CLIP_PRE_ROLL + 10.0 + CLIP_POST_ROLL
+# Max memory ng buffer kada camera (MB), kahit ilang estudyante ang sabay na nag-trigger
+# Ito ang panimulang budget; kusang lumalaki ayon sa totoong bytes/second ng camera (full-res main
+# stream habang may timer) hanggang CLIP_BUFFER_HARD_MAX_MB para buo pa rin ang pre-roll + timer
+CLIP_BUFFER_MAX_MB = int(os.environ.get("SEMS_CLIP_BUFFER_MAX_MB", "64"))
+CLIP_BUFFER_HARD_MAX_MB = int(os.environ.get("SEMS_CLIP_BUFFER_HARD_MAX_MB", "256"))
+# Mas malapad na frames (e.g. 1080p main stream) ay pinapaliit muna bago i-JPEG sa buffer
+CLIP_MAX_WIDTH = 1280
+CLIP_JPEG_QUALITY = 80
+# Background clip encoder: ilang thread, ilang job ang pwedeng nakapila, at gaano katagal
+# (seconds) maghihintay ang camera worker bago itapon ang clip kapag puno ang pila
+CLIP_WRITER_THREADS = int(os.environ.get("SEMS_CLIP_WRITER_THREADS", "2"))
+CLIP_QUEUE_SIZE = 8
+CLIP_QUEUE_TIMEOUT = 0.05
+
+# --- Manual Recording (background writer, constant fps, segmented files) ---
+RECORD_FPS = 20.0
+# Bagong file kada ilang minuto para hindi masira ang buong multi-hour AVI sa isang stall
+RECORD_SEGMENT_MINUTES = int(os.environ.get("SEMS_RECORD_SEGMENT_MINUTES", "15"))
+# Frames na pwedeng nakapila sa writer bago magtapon
+RECORD_QUEUE_SIZE = 60
+# Max tagal (seconds) na inuulit ang huling frame kapag walang dumating (e.g. naputol ang camera);
+# lampas dito, bagong segment na lang pagbalik ng frames para walang "frozen" na footage
+RECORD_MAX_GAP = 2.0
+
+# --- Database Service (iisang writer thread, WAL mode) ---
+# Max writes kada transaction at gaano katagal (seconds) hihintayin ang iba pang isasama
+DB_WRITE_BATCH = 50
+DB_WRITE_MAX_WAIT = 0.05
+
+# --- Reports View ---
+# Ilang violation rows ang ilo-load kada page (habang nagso-scroll)
+REPORTS_PAGE_SIZE = 100
+# Hintay (ms) pagkatapos ng huling pindot bago patakbuhin ang search
+REPORTS_SEARCH_DEBOUNCE_MS = 300
+
+# --- Ghost Record Reconciler ---
+# Full sweep (seconds) ng violations/ at replays/ laban sa database, bukod sa filesystem events
+RECONCILE_INTERVAL = 300.0
+# Kung walang watchdog: kada ilang segundo ikukumpara ang listahan ng files sa violations/ at replays/
+RECONCILE_WATCH_INTERVAL = 2.0
+
+# --- Replay Thumbnails (persistent cache) ---
+THUMBNAIL_DIR = os.path.join("replays", ".thumbnails")
+# Max laki ng thumbnail cache sa disk (MB); LRU ang tinatanggal
+THUMBNAIL_CACHE_MB = 100
+# Ilang thumbnails ang naka-hold sa memory
+THUMBNAIL_MEMORY_ITEMS = 300
+
+# --- Replay Grid (virtualized) ---
+REPLAY_COLUMNS = 4
+# Taas (px) ng isang row ng cards kasama ang padding; ginagamit para malaman ilang row ang nakikita
+REPLAY_ROW_HEIGHT = 250
+# Ilang recordings ang kinukuha kada query (LIMIT/OFFSET) habang nagso-scroll
+REPLAY_PAGE_SIZE = 100
+
+# --- Clip Player ---
+# Ilang frames sa unahan ng playhead ang dine-decode sa background
+PLAYER_PREFETCH_FRAMES = 30
+# Kapag mas malayo dito (frames) ang target, seek na imbes na grab() nang sunod-sunod
+PLAYER_SEEK_THRESHOLD = 90
+
+# --- Detection Log (per-frame detection metadata kada camera) ---
+DETLOG_ENABLED = os.environ.get("SEMS_DETLOG", "1") != "0"
+DETLOG_DIR = "detections"
+# Ilang frames kada transaction at max na hintay (seconds) bago i-flush
+DETLOG_BATCH = 200
+DETLOG_FLUSH_SECONDS = 2.0
+# Frames na pwedeng nakapila bago magtapon (hindi bumabagal ang camera worker)
+DETLOG_QUEUE_SIZE = 2000
@@ -1,10 +1,48 @@
 import sqlite3
+import threading
+import queue
+import time
+import datetime
+
+from sems_config import DB_WRITE_BATCH, DB_WRITE_MAX_WAIT
+
+DB_NAME = "sems_reports.db"
+# PRAGMA user_version: 1 = ISO-8601 date_time (sortable) + indexes
+SCHEMA_VERSION = 1
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+LEGACY_TIMESTAMP_FORMAT = "%Y-%m-%d %I:%M %p"
+DISPLAY_TIMESTAMP_FORMAT = "%Y-%m-%d %I:%M %p"
+
+
+def format_timestamp(dt=None):
+    # Ang format na sine-save sa date_time (sumusunod sa tamang pagkakasunod-sunod kapag sinort bilang text)
+    return (dt or datetime.datetime.now()).strftime(TIMESTAMP_FORMAT)
+
+
+def display_timestamp(value):
+    # Pang-UI: ibalik sa dating itsura ("2025-03-01 02:30 PM")
+    try:
+        return datetime.datetime.strptime(str(value), TIMESTAMP_FORMAT).strftime(DISPLAY_TIMESTAMP_FORMAT)
+    except ValueError:
+        return value
+
 
 class Database:
-    def __init__(self, db_name="sems_reports.db"):
-        self.conn = sqlite3.connect(db_name)
+    # Isang SQLite connection. Hindi na ito direktang ginagawa ng UI; dumadaan na sa DatabaseService
+    # (isang writer connection + read-only connection kada thread). read_only=True ay hindi na gumagawa ng schema.
+    def __init__(self, db_name=DB_NAME, read_only=False, check_same_thread=True):
+        self.conn = sqlite3.connect(db_name, check_same_thread=check_same_thread)
         self.cursor = self.conn.cursor()
-        self.create_tables()
+        # False sa writer ng DatabaseService: siya na ang nagco-commit kada batch
+        self.autocommit = True
+        if read_only:
+            self.conn.execute("PRAGMA query_only=ON")
+        else:
+            self.create_tables()
+
+    def commit(self):
+        if self.autocommit:
+            self.conn.commit()
 
     def create_tables(self):
         # 1. Dinagdag ang camera_type sa violations table
@@ -25,9 +63,14 @@ class Database:
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 room_name TEXT,
                 camera_type TEXT,
-                camera_url TEXT
+                camera_url TEXT,
+                use_substream INTEGER DEFAULT 1
             )
         ''')
+        # BAGO: Para sa lumang database na wala pang use_substream column
+        cam_cols = [row[1] for row in self.cursor.execute("PRAGMA table_info(saved_cameras)").fetchall()]
+        if "use_substream" not in cam_cols:
+            self.cursor.execute("ALTER TABLE saved_cameras ADD COLUMN use_substream INTEGER DEFAULT 1")
 
         # 3. Table for Manual Recordings (Para sa Replay System)
         self.cursor.execute('''
@@ -39,55 +82,311 @@ class Database:
                 file_path TEXT
             )
         ''')
+        self.migrate()
         self.conn.commit()
 
+    def migrate(self):
+        version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            # Lumang "%Y-%m-%d %I:%M %p" -> ISO-8601 para sortable at pwedeng i-range query
+            for table in ("violations", "recordings"):
+                rows = self.cursor.execute(f"SELECT id, date_time FROM {table}").fetchall()
+                updates = []
+                for row_id, value in rows:
+                    try:
+                        updates.append((datetime.datetime.strptime(str(value), LEGACY_TIMESTAMP_FORMAT).strftime(TIMESTAMP_FORMAT), row_id))
+                    except ValueError:
+                        pass # Naka-ISO na o hindi mabasa; iwan na lang
+                self.cursor.executemany(f"UPDATE {table} SET date_time=? WHERE id=?", updates)
+
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_violations_room_time ON violations (room_name, date_time)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_violations_time ON violations (date_time)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_violations_type ON violations (violation_type)")
+            self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_recordings_room_time ON recordings (room_name, date_time)")
+        self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def build_filters(self, room=None, room_search=None, start=None, end=None, v_type=None):
+        # WHERE clause para sa query methods. start/end ay datetime o ISO string; end ay exclusive.
+        clauses, params = [], []
+        if room is not None:
+            clauses.append("room_name = ?"); params.append(room)
+        if room_search:
+            clauses.append("room_name LIKE ? ESCAPE '\\'")
+            params.append("%" + room_search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if start is not None:
+            clauses.append("date_time >= ?"); params.append(start if isinstance(start, str) else format_timestamp(start))
+        if end is not None:
+            clauses.append("date_time < ?"); params.append(end if isinstance(end, str) else format_timestamp(end))
+        if v_type is not None:
+            clauses.append("violation_type = ?"); params.append(v_type)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
     # ==========================================
     # --- VIOLATION METHODS (Para sa Reports) ---
     # ==========================================
     def insert_violation(self, room, cam_type, v_type, dt, path):
         # BAGO: Tinatanggap na niya ang cam_type
         self.cursor.execute("INSERT INTO violations (room_name, camera_type, violation_type, date_time, file_path) VALUES (?, ?, ?, ?, ?)", (room, cam_type, v_type, dt, path))
-        self.conn.commit()
+        self.commit()
         return self.cursor.lastrowid
 
     def fetch_all_violations(self):
         self.cursor.execute("SELECT * FROM violations ORDER BY id DESC")
         return self.cursor.fetchall()
 
+    def query_violations(self, room=None, room_search=None, start=None, end=None, v_type=None, limit=None, offset=0):
+        # Lahat ng filter ay sa SQL (gamit ang indexes), pinakabago muna
+        where, params = self.build_filters(room, room_search, start, end, v_type)
+        sql = "SELECT * FROM violations" + where + " ORDER BY date_time DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"; params += [limit, offset]
+        self.cursor.execute(sql, params)
+        return self.cursor.fetchall()
+
+    def count_violations(self, room=None, room_search=None, start=None, end=None, v_type=None):
+        where, params = self.build_filters(room, room_search, start, end, v_type)
+        self.cursor.execute("SELECT COUNT(*) FROM violations" + where, params)
+        return self.cursor.fetchone()[0]
+
     def delete_violation(self, rec_id):
         self.cursor.execute("DELETE FROM violations WHERE id=?", (rec_id,))
-        self.conn.commit()
+        self.commit()
+
+    def delete_violations(self, rec_ids):
+        self.cursor.executemany("DELETE FROM violations WHERE id=?", [(i,) for i in rec_ids])
+        self.commit()
 
     # ==========================================
     # --- RECORDING METHODS (Para sa Replays) ---
     # ==========================================
     def insert_record(self, room, cam_type, dt, path):
         self.cursor.execute("INSERT INTO recordings (room_name, camera_type, date_time, file_path) VALUES (?, ?, ?, ?)", (room, cam_type, dt, path))
-        self.conn.commit()
+        self.commit()
         return self.cursor.lastrowid
 
     def fetch_all(self):
         self.cursor.execute("SELECT * FROM recordings ORDER BY id DESC")
         return self.cursor.fetchall()
 
+    def query_recordings(self, room=None, room_search=None, start=None, end=None, limit=None, offset=0):
+        where, params = self.build_filters(room, room_search, start, end)
+        sql = "SELECT * FROM recordings" + where + " ORDER BY date_time DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"; params += [limit, offset]
+        self.cursor.execute(sql, params)
+        return self.cursor.fetchall()
+
+    def count_recordings(self, room=None, room_search=None, start=None, end=None):
+        where, params = self.build_filters(room, room_search, start, end)
+        self.cursor.execute("SELECT COUNT(*) FROM recordings" + where, params)
+        return self.cursor.fetchone()[0]
+
     def delete_record(self, rec_id):
         self.cursor.execute("DELETE FROM recordings WHERE id=?", (rec_id,))
-        self.conn.commit()
+        self.commit()
+
+    def delete_records(self, rec_ids):
+        self.cursor.executemany("DELETE FROM recordings WHERE id=?", [(i,) for i in rec_ids])
+        self.commit()
 
     # ==========================================
     # --- CAMERA SAVING METHODS ---
     # ==========================================
-    def insert_camera(self, room, cam_type, url):
-        self.cursor.execute("INSERT INTO saved_cameras (room_name, camera_type, camera_url) VALUES (?, ?, ?)", (room, cam_type, url))
-        self.conn.commit()
+    def insert_camera(self, room, cam_type, url, use_substream=1):
+        self.cursor.execute("INSERT INTO saved_cameras (room_name, camera_type, camera_url, use_substream) VALUES (?, ?, ?, ?)", (room, cam_type, url, use_substream))
+        self.commit()
         
     def fetch_all_cameras(self):
-        self.cursor.execute("SELECT room_name, camera_type, camera_url FROM saved_cameras")
+        self.cursor.execute("SELECT room_name, camera_type, camera_url, use_substream FROM saved_cameras")
         return self.cursor.fetchall()
         
     def delete_camera_by_name(self, room_name):
         self.cursor.execute("DELETE FROM saved_cameras WHERE room_name=?", (room_name,))
-        self.conn.commit()
+        self.commit()
+
+    # ==========================================
+    # --- FILE PATHS (Para sa ghost-record reconciler) ---
+    # ==========================================
+    def fetch_file_paths(self, table):
+        # table ay "violations" o "recordings" lang (galing sa code, hindi sa user)
+        self.cursor.execute(f"SELECT id, file_path FROM {table}")
+        return self.cursor.fetchall()
+
+    def find_by_filename(self, table, filename):
+        self.cursor.execute(f"SELECT id, file_path FROM {table} WHERE file_path LIKE ?", ("%" + filename,))
+        return self.cursor.fetchall()
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        self.conn.close()
+
+
+class WriteRequest:
+    def __init__(self, method, args, on_done=None):
+        self.method = method
+        self.args = args
+        self.on_done = on_done
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self, timeout=5.0):
+        # Para sa UI na kailangang makita agad ang pagbabago (e.g. delete tapos reload).
+        # Nagre-raise kapag hindi natapos o pumalya, para hindi kumilos ang caller (hal. magbura
+        # ng file) sa row na baka nasa database pa
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"Database {self.method} did not finish within {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class DatabaseService(threading.Thread):
+    # Iisang long-lived database para sa buong app:
+    # - WAL mode para hindi nagba-block ang readers habang may sumusulat
+    # - Iisang writer thread; ang mga insert/delete ay pinipila at pinagsasama sa isang transaction
+    # - Read-only connection kada thread (UI views) para sa SELECT
+    # - create_tables() isang beses lang, dito sa startup
+    def __init__(self, db_name=DB_NAME, batch_size=DB_WRITE_BATCH, max_wait=DB_WRITE_MAX_WAIT):
+        super().__init__(daemon=True)
+        self.db_name = db_name
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.writer = Database(db_name, check_same_thread=False)
+        self.writer.conn.execute("PRAGMA journal_mode=WAL")
+        self.writer.conn.execute("PRAGMA synchronous=NORMAL")
+        self.writer.autocommit = False
+        self.requests = queue.Queue()
+        self.local = threading.local()
+        self.running = False
+
+    def start(self):
+        self.running = True
+        super().start()
+        return self
+
+    def reader(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = self.local.db = Database(self.db_name, read_only=True)
+        return db
+
+    def submit(self, method, *args, on_done=None):
+        # on_done(result) ay tinatawag sa writer thread pagkatapos ma-commit
+        req = WriteRequest(method, args, on_done)
+        self.requests.put(req)
+        return req
+
+    def next_request(self, timeout):
+        try:
+            return self.requests.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def run(self):
+        while True:
+            first = self.next_request(0.5)
+            if first is None:
+                if not self.running: break
+                continue
+
+            batch = [first]
+            deadline = time.time() + self.max_wait
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                remaining = deadline - time.time()
+                req = self.next_request(remaining) if remaining > 0 else None
+                if req is None: break
+                batch.append(req)
+            stopping = batch[-1] is None
+            batch = [req for req in batch if req is not None]
+
+            for req in batch:
+                try:
+                    req.result = getattr(self.writer, req.method)(*req.args)
+                except Exception as e:
+                    req.error = e
+                    print(f"ERROR: Database {req.method} failed: {e}")
+            try:
+                self.writer.conn.commit()
+            except Exception as e:
+                print(f"ERROR: Database commit failed: {e}")
+                for req in batch:
+                    if req.error is None: req.error = e
+
+            for req in batch:
+                req.done.set()
+                if req.on_done and req.error is None:
+                    try: req.on_done(req.result)
+                    except Exception as e: print(f"ERROR: {e}")
+            if stopping: break
+        self.writer.close()
+
+    def stop(self):
+        # Isusulat muna ang lahat ng nakapila bago isara
+        self.running = False
+        self.requests.put(None)
+        self.join(timeout=5)
+
+    # --- READS (read-only connection ng tumatawag na thread) ---
+    def fetch_all_violations(self):
+        return self.reader().fetch_all_violations()
+
+    def fetch_all(self):
+        return self.reader().fetch_all()
+
+    def fetch_all_cameras(self):
+        return self.reader().fetch_all_cameras()
+
+    def query_violations(self, **filters):
+        return self.reader().query_violations(**filters)
+
+    def count_violations(self, **filters):
+        return self.reader().count_violations(**filters)
+
+    def query_recordings(self, **filters):
+        return self.reader().query_recordings(**filters)
+
+    def count_recordings(self, **filters):
+        return self.reader().count_recordings(**filters)
+
+    def fetch_file_paths(self, table):
+        return self.reader().fetch_file_paths(table)
+
+    def find_by_filename(self, table, filename):
+        return self.reader().find_by_filename(table, filename)
+
+    # --- WRITES (naka-pila; ibinabalik ang WriteRequest) ---
+    def insert_violation(self, room, cam_type, v_type, dt, path, on_done=None):
+        return self.submit("insert_violation", room, cam_type, v_type, dt, path, on_done=on_done)
+
+    def delete_violation(self, rec_id):
+        return self.submit("delete_violation", rec_id)
+
+    def delete_violations(self, rec_ids):
+        return self.submit("delete_violations", list(rec_ids))
+
+    def insert_record(self, room, cam_type, dt, path, on_done=None):
+        return self.submit("insert_record", room, cam_type, dt, path, on_done=on_done)
+
+    def delete_record(self, rec_id):
+        return self.submit("delete_record", rec_id)
+
+    def delete_records(self, rec_ids):
+        return self.submit("delete_records", list(rec_ids))
+
+    def insert_camera(self, room, cam_type, url, use_substream=1):
+        return self.submit("insert_camera", room, cam_type, url, use_substream)
+
+    def delete_camera_by_name(self, room_name):
+        return self.submit("delete_camera_by_name", room_name)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_db():
+    # Ang iisang DatabaseService ng app (ginagawa sa unang tawag)
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = DatabaseService().start()
+        return _service
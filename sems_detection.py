@@ -0,0 +1,229 @@
+import cv2
+import numpy as np
+import threading
+import queue
+import time
+from collections import deque
+
+from sems_config import SSD_BATCH_SIZE, SSD_BATCH_MAX_WAIT
+
+SSD_INPUT_SIZE = (300, 300)
+PERSON_CLASS_ID = 15
+
+
+# --- Load Deep Learning Models (MobileNet-SSD) ---
+# Isang net lang kada DetectionService (thread mode) o kada child process (process mode)
+def load_person_net():
+    try:
+        net = cv2.dnn.readNetFromCaffe("MobileNetSSD_deploy.prototxt", "MobileNetSSD_deploy.caffemodel")
+        print("SUCCESS: MobileNet-SSD Loaded for Exam & Decorum Monitoring!")
+        return net
+    except Exception as e:
+        print(f"ERROR: MobileNet files missing! Error: {e}")
+        return None
+
+
+def prepare_ssd_input(frame):
+    # Ginagawa sa thread ng camera para parallel ang resize bago pumasok sa batch
+    return cv2.resize(frame, SSD_INPUT_SIZE)
+
+
+def detect_persons_batch(net, inputs):
+    # Isang forward pass para sa lahat ng camera. Ang column 0 ng SSD output ay ang
+    # index ng image sa batch, kaya doon natin hinihiwalay pabalik kada camera.
+    blob = cv2.dnn.blobFromImages(inputs, 0.007843, SSD_INPUT_SIZE, 127.5)
+    net.setInput(blob)
+    dets = net.forward()
+    image_ids = dets[0, 0, :, 0]
+    return [dets[:, :, image_ids == i, :] for i in range(len(inputs))]
+
+
+# =========================================================================
+# POST-PROCESSING (shared ng Exam at Decorum; lahat ay NumPy array ops)
+# =========================================================================
+def filter_persons(dets, frame_shape, min_conf, min_w, min_h):
+    # SSD output -> (boxes (N, 4) na x, y, w, h sa pixels, scores (N,)) ng mga tao lang.
+    # Isang mask sa buong output imbes na isa-isang row sa Python.
+    if dets is None or dets.size == 0:
+        return np.empty((0, 4), dtype=int), np.empty(0)
+    ih, iw = frame_shape[:2]
+    rows = dets.reshape(-1, dets.shape[-1])
+    rows = rows[(rows[:, 1].astype(int) == PERSON_CLASS_ID) & (rows[:, 2] > min_conf)]
+
+    corners = (rows[:, 3:7] * np.array([iw, ih, iw, ih])).astype(int)
+    corners[:, [0, 2]] = np.clip(corners[:, [0, 2]], 0, iw)
+    corners[:, [1, 3]] = np.clip(corners[:, [1, 3]], 0, ih)
+    boxes = np.column_stack([corners[:, :2], corners[:, 2:] - corners[:, :2]])
+
+    keep = (boxes[:, 2] > min_w) & (boxes[:, 3] > min_h)
+    return boxes[keep], rows[keep, 2]
+
+
+def center_containment(inner, outer):
+    # (I, O) bool matrix: nasa loob ba ng outer box ang gitna ng inner box (x, y, w, h)
+    cx = inner[:, 0:1] + inner[:, 2:3] / 2
+    cy = inner[:, 1:2] + inner[:, 3:4] / 2
+    return ((outer[None, :, 0] < cx) & (cx < outer[None, :, 0] + outer[None, :, 2]) &
+            (outer[None, :, 1] < cy) & (cy < outer[None, :, 1] + outer[None, :, 3]))
+
+
+def nms(boxes, scores, iou_threshold=0.5):
+    # Non-maximum suppression (x, y, w, h) -> indices ng natirang boxes, pinakamataas na score muna
+    if len(boxes) == 0:
+        return np.empty(0, dtype=int)
+    boxes = np.asarray(boxes, dtype=np.float64)
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    areas = boxes[:, 2] * boxes[:, 3]
+    order = np.argsort(scores)[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=int)
+
+
+def fuse_face_person(face_boxes, face_turned, face_scores, person_boxes, person_scores, iou_threshold=0.5):
+    # Iisang candidate kada estudyante. Ang mukha na nasa loob ng isang person box ay
+    # pinagsasama sa box na iyon (dala ang is_turning). Kapag 2+ mukha ang nasa iisang
+    # person box (magkatabing estudyante na pinagsama ng SSD), ang mga mukha ang itinatabi.
+    # -> (boxes (N, 4), is_turning (N,), scores (N,)) pagkatapos ng NMS
+    face_boxes = np.asarray(face_boxes, dtype=int).reshape(-1, 4)
+    face_turned = np.asarray(face_turned, dtype=bool)
+    face_scores = np.asarray(face_scores, dtype=np.float64)
+    person_boxes = np.asarray(person_boxes, dtype=int).reshape(-1, 4)
+    person_scores = np.asarray(person_scores, dtype=np.float64)
+
+    inside = center_containment(face_boxes, person_boxes)
+    faces_per_person = inside.sum(axis=0)
+    single = faces_per_person == 1
+    # Mukha na sakop ng person box na may iisang mukha lang ay kasama na sa box na iyon
+    absorbed = (inside & single[None, :]).any(axis=1)
+    person_turning = (inside & face_turned[:, None]).any(axis=0)
+
+    keep_person = faces_per_person <= 1
+    keep_face = ~absorbed
+    boxes = np.concatenate([person_boxes[keep_person], face_boxes[keep_face]])
+    turning = np.concatenate([person_turning[keep_person], face_turned[keep_face]])
+    scores = np.concatenate([person_scores[keep_person], face_scores[keep_face]])
+
+    keep = nms(boxes, scores, iou_threshold)
+    return boxes[keep], turning[keep], scores[keep]
+
+
+class BatchSizer:
+    # Ilang frame ang sulit hintayin para sa isang SSD batch. Dahil sa detection cadence,
+    # motion gate at QoS, iilang camera lang ang nagpapasa kada sandali, kaya hindi na
+    # bilang ng camera ang target kundi ang mga nakapila na + inaasahang darating sa loob
+    # ng max_wait (galing sa submit rate ng huling `window` seconds).
+    def __init__(self, batch_size, max_wait, window=1.0):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.window = window
+        self.times = deque()
+        self.lock = threading.Lock()
+
+    def trim(self, now):
+        while self.times and now - self.times[0] > self.window:
+            self.times.popleft()
+
+    def record(self, count=1):
+        now = time.time()
+        with self.lock:
+            self.times.extend([now] * count)
+            self.trim(now)
+
+    def target(self, queued=0, clients=None):
+        with self.lock:
+            self.trim(time.time())
+            rate = len(self.times) / self.window
+        expected = 1 + queued + int(round(rate * self.max_wait))
+        if clients: expected = min(expected, clients)
+        return max(1, min(self.batch_size, expected))
+
+
+def collect_batch(first, get_next, max_wait, target):
+    # Hintayin mapuno ang batch hanggang `target` frames (galing sa BatchSizer) o max_wait
+    batch = [first]
+    deadline = time.time() + max_wait
+    while len(batch) < target:
+        remaining = deadline - time.time()
+        if remaining <= 0: break
+        item = get_next(remaining)
+        if item is None: break
+        batch.append(item)
+    return batch
+
+
+class DetectionService(threading.Thread):
+    # Iisang MobileNet-SSD para sa lahat ng camera (thread mode). Ang bawat worker ay
+    # tumatawag ng detect(frame) at naghihintay habang pinagsasama-sama ang batch.
+    def __init__(self, batch_size=SSD_BATCH_SIZE, max_wait=SSD_BATCH_MAX_WAIT):
+        super().__init__(daemon=True)
+        # Ilo-load ang net sa sariling thread para hindi bumagal ang pagbukas ng dashboard
+        self.net = None
+        self.loaded = threading.Event()
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.clients = 0
+        self.clients_lock = threading.Lock()
+        self.sizer = BatchSizer(batch_size, max_wait)
+        self.running = True
+        self.batches = 0
+        self.frames = 0
+
+    def register(self):
+        with self.clients_lock:
+            self.clients += 1
+
+    def unregister(self):
+        with self.clients_lock:
+            self.clients = max(0, self.clients - 1)
+
+    def detect(self, frame):
+        self.loaded.wait(timeout=10)
+        if self.net is None: return None
+        req = {"input": prepare_ssd_input(frame), "done": threading.Event(), "dets": None}
+        self.sizer.record()
+        self.requests.put(req)
+        # May timeout para hindi ma-stuck ang worker kung huminto ang service
+        req["done"].wait(timeout=2.0)
+        return req["dets"]
+
+    def next_request(self, timeout):
+        try:
+            return self.requests.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def run(self):
+        self.net = load_person_net()
+        self.loaded.set()
+
+        while self.running:
+            first = self.next_request(0.1)
+            if first is None: continue
+
+            target = self.sizer.target(queued=self.requests.qsize(), clients=self.clients)
+            batch = collect_batch(first, self.next_request, self.max_wait, target)
+            try:
+                results = detect_persons_batch(self.net, [req["input"] for req in batch])
+            except Exception as e:
+                print(f"ERROR: Batched MobileNet-SSD failed: {e}")
+                results = [None] * len(batch)
+
+            self.batches += 1
+            self.frames += len(batch)
+            for req, dets in zip(batch, results):
+                req["dets"] = dets
+                req["done"].set()
+
+    def stop(self):
+        self.running = False
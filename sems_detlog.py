@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+import queue
+import time
+import datetime
+import numpy as np
+
+from sems_config import DETLOG_DIR, DETLOG_BATCH, DETLOG_FLUSH_SECONDS, DETLOG_QUEUE_SIZE
+
+# =========================================================================
+# DETECTION LOG (detections/<room>.db)
+# Isang row kada na-analyze na frame ng bawat camera (camera + frame seq; pwedeng
+# magkapareho ang room name ng dalawang camera): mga bilang at top score para sa
+# mabilis na WHERE, at ang tracked boxes/IDs/flags/scores at raw detector boxes
+# bilang packed NumPy BLOBs. Pwedeng patakbuhin ulit ang rules sa lumang footage
+# nang hindi dine-decode ang video.
+# =========================================================================
+FLAG_TURNED = 1      # Exam: nakatingin sa gilid
+FLAG_RESTRICTED = 2  # Decorum: nasa restricted zone (lampas sa red line)
+FLAG_SEATING = 4     # Decorum: lampas sa yellow line (improper seating)
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS frames (
+        camera TEXT, seq INTEGER, time REAL, cam_type TEXT, detected INTEGER,
+        persons INTEGER, turned INTEGER, zone INTEGER, top_score REAL,
+        boxes BLOB, ids BLOB, flags BLOB, scores BLOB, raw_boxes BLOB, raw_scores BLOB
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_frames_time ON frames (time)",
+]
+COLUMNS = ("camera, seq, time, cam_type, detected, persons, turned, zone, top_score, "
+           "boxes, ids, flags, scores, raw_boxes, raw_scores")
+
+
+def log_path(room_name, folder=DETLOG_DIR):
+    return os.path.join(folder, room_name.replace(' ', '_') + ".db")
+
+
+def detection_record(boxes, ids, flags, scores, detected, raw_boxes=(), raw_scores=()):
+    # Ginagawa ng CameraAnalyzer kada frame; plain lists lang (mura, at pickle-able sa process mode).
+    # scores = huling detector score ng bawat track; raw_* = output ng detector sa frame na ito
+    # (face/person boxes bago i-track), walang laman kapag flow o motion-gated ang frame.
+    return {"boxes": boxes, "ids": ids, "flags": flags, "scores": scores, "detected": detected,
+            "raw_boxes": raw_boxes, "raw_scores": raw_scores}
+
+
+def pack_boxes(boxes):
+    return np.asarray(boxes, dtype=np.int16).reshape(-1, 4).tobytes()
+
+
+def unpack_boxes(blob):
+    return np.frombuffer(blob, dtype=np.int16).reshape(-1, 4)
+
+
+def pack_record(camera, seq, timestamp, cam_type, rec):
+    flags = np.asarray(rec["flags"], dtype=np.uint8)
+    scores = np.asarray(rec["scores"], dtype=np.float16)
+    return (camera, seq, timestamp, cam_type, int(rec["detected"]), len(flags),
+            int(np.count_nonzero(flags & FLAG_TURNED)), int(np.count_nonzero(flags & FLAG_RESTRICTED)),
+            float(scores.max()) if scores.size else 0.0,
+            pack_boxes(rec["boxes"]), np.asarray(rec["ids"], dtype=np.int32).tobytes(), flags.tobytes(),
+            scores.tobytes(), pack_boxes(rec["raw_boxes"]), np.asarray(rec["raw_scores"], dtype=np.float16).tobytes())
+
+
+def unpack_row(row):
+    (camera, seq, timestamp, cam_type, detected, persons, turned, zone, top_score,
+     boxes, ids, flags, scores, raw_boxes, raw_scores) = row
+    return {"camera": camera, "seq": seq, "time": timestamp, "cam_type": cam_type, "detected": bool(detected),
+            "persons": persons, "turned": turned, "zone": zone, "top_score": top_score,
+            "boxes": unpack_boxes(boxes),
+            "ids": np.frombuffer(ids, dtype=np.int32),
+            "flags": np.frombuffer(flags, dtype=np.uint8),
+            "scores": np.frombuffer(scores, dtype=np.float16),
+            "raw_boxes": unpack_boxes(raw_boxes),
+            "raw_scores": np.frombuffer(raw_scores, dtype=np.float16)}
+
+
+def epoch(value):
+    if isinstance(value, datetime.datetime): return value.timestamp()
+    return value
+
+
+class DetectionLog(threading.Thread):
+    # Iisang writer thread para sa lahat ng camera. Ang worker ay put_nowait lang;
+    # ang packing at INSERT ay dito, naka-batch kada DETLOG_BATCH frames o DETLOG_FLUSH_SECONDS.
+    def __init__(self, folder=DETLOG_DIR):
+        super().__init__(daemon=True)
+        self.folder = folder
+        self.jobs = queue.Queue(maxsize=DETLOG_QUEUE_SIZE)
+        self.conns = {}
+        self.dropped = 0
+        self.running = False
+
+    def start(self):
+        self.running = True
+        super().start()
+        return self
+
+    def submit(self, room_name, camera, seq, cam_type, timestamp, rec):
+        # camera = pangalan ng stream (walang password); seq = bilang ng frame ng worker
+        try:
+            self.jobs.put_nowait((room_name, camera, seq, cam_type, timestamp, rec))
+        except queue.Full:
+            self.dropped += 1
+
+    def connection(self, room_name):
+        conn = self.conns.get(room_name)
+        if conn is None:
+            if not os.path.exists(self.folder):
+                os.makedirs(self.folder)
+            conn = sqlite3.connect(log_path(room_name, self.folder))
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            self.conns[room_name] = conn
+        return conn
+
+    def flush(self, batch):
+        by_room = {}
+        for room_name, camera, seq, cam_type, timestamp, rec in batch:
+            by_room.setdefault(room_name, []).append(pack_record(camera, seq, timestamp, cam_type, rec))
+        for room_name, rows in by_room.items():
+            try:
+                conn = self.connection(room_name)
+                with conn:
+                    conn.executemany(f"INSERT INTO frames ({COLUMNS}) VALUES ({', '.join('?' * 15)})", rows)
+            except Exception as e:
+                print(f"WARNING: Could not write detection log for {room_name}: {e}")
+
+    def run(self):
+        batch = []
+        deadline = time.time() + DETLOG_FLUSH_SECONDS
+        while self.running or not self.jobs.empty():
+            try:
+                batch.append(self.jobs.get(timeout=max(0.0, deadline - time.time())))
+            except queue.Empty:
+                pass
+            if len(batch) >= DETLOG_BATCH or time.time() >= deadline or (not self.running and self.jobs.empty()):
+                if batch: self.flush(batch)
+                batch = []
+                deadline = time.time() + DETLOG_FLUSH_SECONDS
+        if batch: self.flush(batch)
+        for conn in self.conns.values():
+            conn.close()
+        self.conns = {}
+
+    def stop(self):
+        # Isusulat muna ang lahat ng nakapila bago magsara
+        self.running = False
+        if self.is_alive(): self.join(timeout=10)
+
+
+def query_detections(room_name, start=None, end=None, min_persons=None, min_zone=None, min_turned=None,
+                     min_score=None, camera=None, cam_type=None, limit=None, folder=DETLOG_DIR):
+    # e.g. Room 101 na may higit 3 tao sa restricted zone mula 9:00 hanggang 10:00:
+    #   query_detections("Room 101", start=nine, end=ten, min_zone=4)
+    # start/end = datetime o epoch seconds. -> [dict na may time, bilang, at NumPy arrays]
+    path = log_path(room_name, folder)
+    if not os.path.exists(path): return []
+    clauses, params = [], []
+    for column, op, value in (("time", ">=", epoch(start)), ("time", "<", epoch(end)), ("persons", ">=", min_persons),
+                              ("zone", ">=", min_zone), ("turned", ">=", min_turned), ("top_score", ">=", min_score),
+                              ("camera", "=", camera), ("cam_type", "=", cam_type)):
+        if value is not None:
+            clauses.append(f"{column} {op} ?")
+            params.append(value)
+    sql = f"SELECT {COLUMNS} FROM frames"
+    if clauses: sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY time, camera, seq"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return [unpack_row(row) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
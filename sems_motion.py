@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+
+from sems_config import MOTION_WIDTH, MOTION_PIXEL_THRESHOLD, MOTION_MIN_AREA, MOTION_MAX_INTERVAL
+
+
+class MotionGate:
+    # Murang frame difference sa maliit na grayscale frame. Kapag walang nagbago sa eksena,
+    # nilalaktawan ang MediaPipe + MobileNet-SSD dahil pareho lang din ang magiging resulta.
+    def __init__(self, width=MOTION_WIDTH, max_interval=MOTION_MAX_INTERVAL):
+        self.width = width
+        self.max_interval = max_interval
+        self.reference = None
+        self.reference_time = 0.0
+        self.kernel = np.ones((3, 3), np.uint8)
+
+    def prepare(self, frame):
+        ih, iw = frame.shape[:2]
+        scale = min(1.0, self.width / float(iw))
+        small = cv2.resize(frame, (int(iw * scale), int(ih * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else frame
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        # Blur para hindi ma-trigger ng sensor noise at compression artifacts ng RTSP
+        return cv2.GaussianBlur(gray, (5, 5), 0), scale
+
+    def check(self, frame, current_time):
+        # -> None kung static ang eksena, kung hindi ay (x, y, w, h) ng nagbagong bahagi sa full-res
+        gray, scale = self.prepare(frame)
+        ih, iw = frame.shape[:2]
+
+        if (self.reference is None or self.reference.shape != gray.shape
+                or current_time - self.reference_time >= self.max_interval):
+            # Unang frame o lumampas na sa max interval: buong frame ang ituturing na nagbago
+            self.reference, self.reference_time = gray, current_time
+            return (0, 0, iw, ih)
+
+        mask = cv2.absdiff(gray, self.reference) > MOTION_PIXEL_THRESHOLD
+        if mask.mean() < MOTION_MIN_AREA:
+            # Hindi pinapalitan ang reference para maipon ang mabagal na pagbabago
+            return None
+
+        self.reference, self.reference_time = gray, current_time
+        mask = cv2.dilate(mask.astype(np.uint8), self.kernel, iterations=2)
+        x, y, w, h = cv2.boundingRect(mask)
+        return (int(x / scale), int(y / scale), int(w / scale), int(h / scale))
@@ -0,0 +1,566 @@
+import cv2
+import numpy as np
+import threading
+import queue
+import time
+import os
+import datetime
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+from PIL import Image
+
+from sems_config import (INFERENCE_MODE, INFERENCE_PROCESSES, SHM_RING_SLOTS, INFERENCE_TIMEOUT, INFERENCE_STALL_POLL,
+                         SSD_BATCH_SIZE, SSD_BATCH_MAX_WAIT,
+                         MAIN_STREAM_LINGER, MAIN_STREAM_WARMUP, QOS_VISIBLE_FPS, QOS_HIDDEN_FPS,
+                         CLIP_PRE_ROLL, CLIP_POST_ROLL, DETLOG_ENABLED)
+from sems_monitoring import CameraAnalyzer, draw_annotations
+from sems_clips import PreRollBuffer, ClipWriterService
+from sems_recorder import SegmentedRecorder
+from sems_detlog import DetectionLog
+from sems_db import get_db, format_timestamp
+from sems_thumbnails import get_thumbnails
+from sems_timeline import EVENT_VIOLATION, EVENT_TIMER_START, EVENT_TIMER_STOP, EVENT_TRACKS
+from sems_detection import (DetectionService, BatchSizer, load_person_net, collect_batch, detect_persons_batch,
+                            prepare_ssd_input)
+
+# =========================================================================
+# CAPTURE -> INFERENCE -> RENDER PIPELINE
+# Bawat camera ay may sariling worker thread. Ang inference ay tumatakbo sa
+# worker mismo ("thread" mode) o sa child process ("process" mode). Ang Tk
+# thread ay taga-display na lang ng mga tapos nang frame.
+# =========================================================================
+
+# Pinakamaikling pagitan (seconds) ng pagproseso kada QoS tier
+QOS_INTERVALS = {
+    "focus": 0.0,
+    "visible": 1.0 / QOS_VISIBLE_FPS,
+    "hidden": 1.0 / QOS_HIDDEN_FPS,
+}
+
+
+def empty_result():
+    return {"annotations": [], "clip_keys": [], "violations": [], "skipped": False, "tracks": 0, "detections": None}
+
+
+def timer_label(key):
+    # Label ng timer sa event timeline: ("student", 3) -> "student 3", "burst" -> "burst"
+    return " ".join(map(str, key)) if isinstance(key, tuple) else str(key)
+
+
+# --- THREAD MODE: MediaPipe sa worker thread, SSD sa iisang batched DetectionService ---
+class LocalAnalyzerBackend:
+    def __init__(self):
+        self.detector = DetectionService()
+        self.detector.start()
+
+    def create_analyzer(self, cam):
+        self.detector.register()
+        return CameraAnalyzer(cam["type"], cam["room_name"], self.detector.detect)
+
+    def release(self, analyzer):
+        analyzer.close()
+        self.detector.unregister()
+
+    def stop(self):
+        self.detector.stop()
+
+
+# --- PROCESS MODE: shared memory ring + child processes ---
+def attach_shared_memory(name):
+    # Ang parent (owner) lang ang dapat mag-unlink. Kapag nirehistro rin ito ng child sa sarili
+    # nitong resource_tracker, "leaked shared_memory" warnings at maagang unlink ang resulta.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedFrameRing:
+    # Fixed na bilang ng frame slots sa isang SharedMemory block (walang pickling ng ndarray)
+    def __init__(self, shape, slots, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = name is None
+        size = int(np.prod(self.shape)) * slots
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = attach_shared_memory(name)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        # Kailangang bitawan muna ang ndarray view bago i-close ang shared memory
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def inference_process_main(task_queue, result_queue):
+    # Tumatakbo sa child process: sariling MobileNet net + MediaPipe detectors kada camera.
+    # Detections/annotations lang ang ibinabalik, hindi ang frame.
+    person_net = load_person_net()
+    analyzers, rings = {}, {}
+    sizer = BatchSizer(SSD_BATCH_SIZE, SSD_BATCH_MAX_WAIT)
+    running = True
+
+    def handle_control(msg):
+        # Lahat ng hindi "frame" na message; ibinabalik ang "frame" para sa batch
+        nonlocal running
+        kind = msg[0]
+        if kind == "stop":
+            running = False
+        elif kind == "add":
+            _, cam_id, cam_type, room_name = msg
+            analyzers[cam_id] = CameraAnalyzer(cam_type, room_name)
+        elif kind == "ring":
+            _, cam_id, name, shape, slots = msg
+            if cam_id in rings: rings.pop(cam_id).close()
+            rings[cam_id] = SharedFrameRing(shape, slots, name=name)
+        elif kind == "frame":
+            return msg
+        elif kind == "remove":
+            _, cam_id = msg
+            if cam_id in analyzers: analyzers.pop(cam_id).close()
+            if cam_id in rings: rings.pop(cam_id).close()
+        return None
+
+    def next_frame_msg(timeout):
+        # Habang naghihintay ng batch, asikasuhin agad ang control messages
+        deadline = time.time() + timeout
+        while running:
+            remaining = deadline - time.time()
+            if remaining <= 0: return None
+            try:
+                msg = task_queue.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            msg = handle_control(msg)
+            if msg: return msg
+        return None
+
+    while running:
+        first = handle_control(task_queue.get())
+        if first is None: continue
+
+        # --- BATCHED MOBILENET-SSD para sa lahat ng camera ng process na ito ---
+        batch = collect_batch(first, next_frame_msg, SSD_BATCH_MAX_WAIT, sizer.target(clients=len(analyzers)))
+        sizer.record(len(batch))
+        batch = [m for m in batch if m[1] in analyzers and m[1] in rings]
+        all_dets = [None] * len(batch)
+        # SSD lang para sa mga camera na nasa detection frame; ang iba ay flow tracking lang
+        detect_idx = [k for k, m in enumerate(batch) if analyzers[m[1]].plan_frame(rings[m[1]].frames[m[2]], m[4])]
+        if person_net is not None and detect_idx:
+            try:
+                inputs = [prepare_ssd_input(rings[batch[k][1]].frames[batch[k][2]]) for k in detect_idx]
+                for k, dets in zip(detect_idx, detect_persons_batch(person_net, inputs)):
+                    all_dets[k] = dets
+            except Exception as e:
+                print(f"ERROR: Batched MobileNet-SSD failed: {e}")
+
+        for (_, cam_id, slot, seq, now), dets in zip(batch, all_dets):
+            try:
+                result = analyzers[cam_id].analyze(rings[cam_id].frames[slot], now, person_dets=dets)
+            except Exception as e:
+                print(f"ERROR: Inference failed on camera {cam_id}: {e}")
+                result = None
+            result_queue.put((cam_id, seq, result))
+
+    for analyzer in analyzers.values(): analyzer.close()
+    for ring in rings.values(): ring.close()
+
+
+class SharedMemoryAnalyzer:
+    # Kapalit ng CameraAnalyzer sa worker thread: isinusulat ang frame sa ring slot,
+    # tapos hinihintay ang resulta galing sa child process.
+    def __init__(self, pool, proc_index, cam_id, cam):
+        self.pool = pool
+        self.proc_index = proc_index
+        self.cam_id = cam_id
+        self.task_queue = pool.task_queues[proc_index]
+        self.results = queue.Queue()
+        self.ring = None
+        self.seq = 0
+        self.stalled = False
+        self.task_queue.put(("add", cam_id, cam["type"], cam["room_name"]))
+
+    def analyze(self, frame, now):
+        if self.ring is None or self.ring.shape != frame.shape:
+            old_ring = self.ring
+            self.ring = SharedFrameRing(frame.shape, SHM_RING_SLOTS)
+            self.task_queue.put(("ring", self.cam_id, self.ring.name, frame.shape, SHM_RING_SLOTS))
+            if old_ring: old_ring.close()
+
+        self.seq += 1
+        slot = self.seq % self.ring.slots
+        np.copyto(self.ring.frames[slot], frame)
+        self.task_queue.put(("frame", self.cam_id, slot, self.seq, now))
+
+        while True:
+            try:
+                seq, result = self.results.get(timeout=INFERENCE_STALL_POLL if self.stalled else INFERENCE_TIMEOUT)
+            except queue.Empty:
+                if not self.stalled:
+                    print(f"WARNING: Inference process timeout (camera {self.cam_id})")
+                self.stalled = True
+                result = empty_result()
+                result["stalled"] = True
+                return result
+            # Buhay pa ang child kapag may dumating na kahit anong resulta
+            self.stalled = False
+            # Itapon ang lumang resulta (galing sa na-timeout na request)
+            if seq == self.seq:
+                return result or empty_result()
+
+    def close(self):
+        if self.ring: self.ring.close()
+        self.ring = None
+
+
+class ProcessInferencePool:
+    def __init__(self, num_processes):
+        # "spawn" para pareho ang behavior sa Windows at Linux (hindi safe ang fork + threads + OpenCV)
+        ctx = mp.get_context("spawn")
+        self.result_queue = ctx.Queue()
+        self.task_queues = []
+        self.processes = []
+        self.load = [0] * num_processes
+        self.proxies = {}
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+        for _ in range(num_processes):
+            task_queue = ctx.Queue()
+            proc = ctx.Process(target=inference_process_main, args=(task_queue, self.result_queue), daemon=True)
+            proc.start()
+            self.task_queues.append(task_queue)
+            self.processes.append(proc)
+
+        self.dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def create_analyzer(self, cam):
+        # Ilagay ang camera sa process na may pinakakaunting camera
+        with self.lock:
+            proc_index = self.load.index(min(self.load))
+            self.load[proc_index] += 1
+            self.next_id += 1
+            proxy = SharedMemoryAnalyzer(self, proc_index, self.next_id, cam)
+            self.proxies[proxy.cam_id] = proxy
+        return proxy
+
+    def release(self, proxy):
+        with self.lock:
+            if self.proxies.pop(proxy.cam_id, None) is None: return
+            self.load[proxy.proc_index] -= 1
+        proxy.task_queue.put(("remove", proxy.cam_id))
+        proxy.close()
+
+    def dispatch(self):
+        # Ipinapasa ang bawat resulta sa tamang camera worker
+        while True:
+            msg = self.result_queue.get()
+            if msg is None: break
+            cam_id, seq, result = msg
+            proxy = self.proxies.get(cam_id)
+            if proxy: proxy.results.put((seq, result))
+
+    def stop(self):
+        for task_queue in self.task_queues:
+            task_queue.put(("stop",))
+        for proc in self.processes:
+            proc.join(timeout=5)
+        self.result_queue.put(None)
+
+
+class CameraWorker(threading.Thread):
+    def __init__(self, cam, backend, events, clip_writer, detection_log=None):
+        super().__init__(daemon=True)
+        self.cam = cam
+        self.backend = backend
+        self.events = events
+        self.clip_writer = clip_writer
+        self.detection_log = detection_log
+        self.clips_dropped = 0
+        # True habang hindi sumasagot ang inference child process (ipinapakita sa camera card)
+        self.inference_stalled = False
+        # Bounded (1 slot): laging pinakabagong annotated frame lang ang hawak, luma ay tinatapon
+        self.output = queue.Queue(maxsize=1)
+        # Iisang compressed pre-roll buffer ng camera; dito hinihiwa ang lahat ng violation clips
+        self.pre_roll = PreRollBuffer()
+        self.pending_clips = [] # (end_time, start_time, v_type, prefix) na hinihintay pa ang post-roll
+        self.timer_started = {} # clip key -> unang frame na nakita ito (para sa pre-roll protection)
+        # Para sa event timeline ng recording
+        self.timer_keys = set()
+        self.last_tracks = None
+        self.events_recorder = None
+        self.running = False
+        self.fps = 0.0
+        # Motion gate stats (ipinapakita sa camera card)
+        self.analyzed_frames = 0
+        self.skipped_frames = 0
+        self.main_last_needed = 0.0
+        self.main_activated_at = 0.0
+        self.qos = None
+
+    def start(self):
+        self.running = True
+        super().start()
+        return self
+
+    def run(self):
+        cam = self.cam
+        analyzer = self.backend.create_analyzer(cam)
+        last_tick = time.time()
+        last_seq = 0
+        last_processed = 0.0
+
+        try:
+            while self.running:
+                # --- QoS: hintayin ang susunod na slot ayon sa tier ng camera ---
+                wait = last_processed + self.apply_qos() - time.time()
+                if wait > 0:
+                    time.sleep(min(wait, 0.1))
+                    continue
+
+                # --- STAGE 1: CAPTURE (walang kopya; laktaw kung walang bagong frame) ---
+                ref = cam["stream"].read_newer(last_seq, timeout=0.1)
+                if ref is None:
+                    continue
+                last_seq = ref.seq
+                last_processed = time.time()
+
+                with ref:
+                    self.process_frame(analyzer, ref.frame, ref.timestamp)
+
+                now = time.time()
+                dt = now - last_tick
+                last_tick = now
+                if dt > 0:
+                    self.fps = self.fps * 0.9 + (1.0 / dt) * 0.1
+        finally:
+            self.backend.release(analyzer)
+
+    def apply_qos(self):
+        # "qos" ay sine-set ng Tk thread: focus (fullscreen), visible (tile), hidden
+        qos = self.cam.get("qos", "visible")
+        if self.cam.get("is_recording"): qos = "focus"
+        interval = QOS_INTERVALS[qos]
+        if qos != self.qos:
+            self.qos = qos
+            self.cam["stream"].set_retrieve_interval(interval)
+        return interval
+
+    def process_frame(self, analyzer, frame, current_time):
+        # Ang frame ay naka-pin na ring slot ng (sub)stream; dito na mismo idino-drawing ang annotations
+        cam = self.cam
+
+        # --- STAGE 2: INFERENCE (sa low-res substream) ---
+        result = analyzer.analyze(frame, current_time)
+        self.inference_stalled = result.get("stalled", False)
+        draw_annotations(frame, result["annotations"])
+        self.analyzed_frames += 1
+        if result.get("skipped"): self.skipped_frames += 1
+
+        # --- FULL-RES MAIN STREAM (bukas lang habang may violation clip o recording) ---
+        capturing = bool(result["clip_keys"]) or bool(self.pending_clips) or cam.get("is_recording", False)
+        main_frame = self.main_stream_frame(frame, result["annotations"], capturing)
+
+        self.apply_result(main_frame if main_frame is not None else frame, current_time, result)
+        self.write_recording(frame, main_frame, current_time)
+        self.record_events(result, current_time)
+        if self.detection_log is not None and result.get("detections") is not None:
+            # Packing at INSERT ay sa DetectionLog thread na
+            self.detection_log.submit(cam["room_name"], cam["stream"].display_name(), self.analyzed_frames,
+                                      cam["type"], current_time, result["detections"])
+
+        # --- STAGE 3: RENDER (resize + convert dito na, hindi sa Tk thread) ---
+        render_size = cam.get("render_size")
+        if render_size:
+            tw, th = render_size
+            resized = cv2.resize(frame, (tw, th), interpolation=cv2.INTER_AREA)
+            self.publish(Image.fromarray(cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)))
+
+    def main_stream_frame(self, frame, annotations, capturing):
+        main = self.cam.get("main_stream")
+        if main is None: return None
+
+        now = time.time()
+        if capturing:
+            if not main.active:
+                main.set_active(True)
+                self.main_activated_at = now
+            self.main_last_needed = now
+        elif main.active and now - self.main_last_needed > MAIN_STREAM_LINGER:
+            main.set_active(False)
+            return None
+
+        if main.status != "live" or now - main.last_frame_time > 1.0:
+            return None
+        ok, main_frame = main.read()
+        if not ok: return None
+
+        sh, sw = frame.shape[:2]
+        mh, mw = main_frame.shape[:2]
+        draw_annotations(main_frame, annotations, scale=(mw / sw, mh / sh))
+        return main_frame
+
+    def write_recording(self, frame, main_frame, current_time):
+        cam = self.cam
+        with cam["record_lock"]:
+            recorder = cam.get("recorder")
+            if not cam.get("is_recording") or recorder is None: return
+            if main_frame is None and cam.get("main_stream") is not None and time.time() - self.main_activated_at < MAIN_STREAM_WARMUP:
+                return # Hintayin munang kumonekta ang main stream para full-res ang recording
+
+            # Ang substream frame ay ring slot pa, kaya kopya; ang main_frame ay kopya na galing sa read()
+            recorder.submit(main_frame if main_frame is not None else frame.copy(), current_time)
+
+    def record_events(self, result, current_time):
+        # Event timeline ng recording: violations, simula/tigil ng timers, at pagbabago ng bilang ng tracks
+        recorder = self.cam.get("recorder")
+        keys = set(map(timer_label, result["clip_keys"]))
+        if recorder is not self.events_recorder:
+            # Bagong recording: ilalabas ulit sa unang frame ang mga tumatakbo nang timers at bilang ng tracks
+            self.events_recorder = recorder
+            self.timer_keys = set()
+            self.last_tracks = None
+        if recorder is not None:
+            for key in keys - self.timer_keys:
+                recorder.add_event(current_time, EVENT_TIMER_START, key)
+            for key in self.timer_keys - keys:
+                recorder.add_event(current_time, EVENT_TIMER_STOP, key)
+            for v_type, _, _ in result["violations"]:
+                recorder.add_event(current_time, EVENT_VIOLATION, v_type.strip())
+            if result.get("tracks", 0) != self.last_tracks:
+                recorder.add_event(current_time, EVENT_TRACKS, "", result.get("tracks", 0))
+        self.timer_keys = keys
+        self.last_tracks = result.get("tracks", 0)
+
+    def apply_result(self, frame, current_time, result):
+        # --- PRE-ROLL BUFFER (lahat ng frame, naka-JPEG; bounded ang memory kada camera) ---
+        # Simula ng bawat tumatakbong timer (clip_keys) para malaman ng buffer kung ano ang hindi pwedeng maputol
+        keys = set(result["clip_keys"])
+        self.timer_started = {k: self.timer_started.get(k, current_time) for k in keys}
+        starts = list(self.timer_started.values()) + [c[1] for c in self.pending_clips]
+        self.pre_roll.push(frame, current_time, protect_since=min(starts) - CLIP_PRE_ROLL if starts else None)
+
+        for v_type, prefix, start_time in result["violations"]:
+            self.pending_clips.append((current_time + CLIP_POST_ROLL, start_time, v_type, prefix))
+
+        # Hiwain ang clip kapag tapos na ang post-roll: [simula ng timer - pre-roll, violation + post-roll]
+        due = [c for c in self.pending_clips if current_time >= c[0]]
+        if not due: return
+        self.pending_clips = [c for c in self.pending_clips if current_time < c[0]]
+        for end_time, start_time, v_type, prefix in due:
+            # Encode + DB insert ay sa ClipWriterService na; dito ay pipila lang ng job
+            job = {"encoded": self.pre_roll.encoded_between(start_time - CLIP_PRE_ROLL, end_time), "prefix": prefix,
+                   "on_saved": lambda filepath, v_type=v_type, when=end_time - CLIP_POST_ROLL: self.on_violation(v_type, filepath, when)}
+            if not self.clip_writer.submit(job):
+                self.clips_dropped += 1
+
+    def skip_ratio(self):
+        return self.skipped_frames / self.analyzed_frames if self.analyzed_frames else 0.0
+
+    def publish(self, img):
+        try:
+            self.output.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self.output.put_nowait(img)
+        except queue.Full:
+            pass
+
+    def latest_image(self):
+        try:
+            return self.output.get_nowait()
+        except queue.Empty:
+            return None
+
+    def on_violation(self, v_type, filepath, when):
+        cam = self.cam
+        date_time = format_timestamp(datetime.datetime.fromtimestamp(when))
+        # Ipaalam sa UI thread ang bagong row kapag na-commit na (hindi pwedeng galawin ang Tk dito)
+        get_db().insert_violation(cam['room_name'], cam['type'], v_type, date_time, filepath,
+                                  on_done=lambda db_id: self.events.put(("violation", cam, (db_id, cam['room_name'], cam['type'], v_type, date_time, filepath))))
+
+    def stop(self):
+        self.running = False
+        if self.is_alive(): self.join(timeout=5)
+
+
+class InferencePipeline:
+    def __init__(self, mode=INFERENCE_MODE):
+        self.workers = []
+        self.events = queue.Queue()
+        self.clip_writer = ClipWriterService()
+        self.detection_log = DetectionLog().start() if DETLOG_ENABLED else None
+        if mode == "process":
+            self.backend = ProcessInferencePool(INFERENCE_PROCESSES)
+        else:
+            self.backend = LocalAnalyzerBackend()
+
+    def add_camera(self, cam):
+        worker = CameraWorker(cam, self.backend, self.events, self.clip_writer, self.detection_log).start()
+        cam["worker"] = worker
+        self.workers.append(worker)
+        return worker
+
+    def remove_camera(self, cam):
+        if cam.get("recorder"): self.stop_recording(cam)
+        worker = cam.pop("worker", None)
+        if worker:
+            worker.stop()
+            self.workers.remove(worker)
+
+    # --- MANUAL RECORDING (tinatawag ng Tk thread) ---
+    def start_recording(self, cam):
+        def on_segment(filepath, start_dt):
+            # Tumatakbo sa recorder thread; ang Replay UI ay ina-update sa update_loop
+            get_thumbnails().prefetch(filepath) # Handa na ang thumbnail pagdating ng card sa Replay
+            start_date = format_timestamp(start_dt)
+            get_db().insert_record(cam['room_name'], cam['type'], start_date, filepath,
+                                   on_done=lambda db_id: self.events.put(("recording", cam, db_id, start_date, filepath)))
+
+        recorder = SegmentedRecorder(cam["room_name"], on_segment).start()
+        with cam["record_lock"]:
+            cam["recorder"] = recorder
+            cam["is_recording"] = True
+        return recorder
+
+    def stop_recording(self, cam):
+        with cam["record_lock"]:
+            cam["is_recording"] = False
+            recorder = cam.pop("recorder", None)
+        if recorder: recorder.stop()
+        return recorder
+
+    def drain_events(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def stop(self):
+        recorders = []
+        for worker in self.workers:
+            worker.running = False
+            if worker.cam.get("recorder"): recorders.append(self.stop_recording(worker.cam))
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+        self.backend.stop()
+        self.clip_writer.stop()
+        if self.detection_log is not None: self.detection_log.stop()
+        # Hintayin ma-flush at ma-register ang huling recording segments
+        for recorder in recorders: recorder.join(timeout=10)
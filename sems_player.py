@@ -0,0 +1,155 @@
+import cv2
+import numpy as np
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+from sems_config import PLAYER_PREFETCH_FRAMES, PLAYER_SEEK_THRESHOLD
+
+
+# =========================================================================
+# FRAME INDEX (naka-cache sa tabi ng video: clip.avi -> clip.avi.index.npy)
+# Isang timestamp (seconds) kada frame. Ang recorder at clip writer ay nagsusulat nito habang
+# nag-e-encode (wall-clock ng capture); ang lumang files ay ini-index sa background.
+# OpenCV ay hindi naglalabas ng keyframe flags, kaya ang seek ay CAP_PROP_POS_FRAMES pa rin
+# (FFmpeg ang bahala sa pinakamalapit na keyframe); ang index ay para sa timestamp <-> frame.
+# =========================================================================
+def index_path(video_path):
+    return str(video_path) + ".index.npy"
+
+
+def save_index(video_path, timestamps):
+    try:
+        with open(index_path(video_path), "wb") as f:
+            np.save(f, np.asarray(timestamps, dtype=np.float64))
+    except Exception as e:
+        print(f"WARNING: Could not save frame index for {video_path}: {e}")
+
+
+def load_index(video_path):
+    # None kung wala o luma na (mas bago ang video kaysa sa index)
+    path = index_path(video_path)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(video_path): return None
+        return np.load(path)
+    except (OSError, ValueError):
+        return None
+
+
+def build_index(video_path):
+    # Para sa clips na walang index: grab() lang (walang color conversion), isang beses
+    cap = cv2.VideoCapture(video_path)
+    timestamps = []
+    while cap.grab():
+        timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+    cap.release()
+    if timestamps: save_index(video_path, timestamps)
+    return np.asarray(timestamps, dtype=np.float64)
+
+
+def remove_index(video_path):
+    try:
+        os.remove(index_path(video_path))
+    except OSError:
+        pass
+
+
+class ClipDecoder(threading.Thread):
+    # Background decoder ng player. Ang UI ay nagre-request ng playhead (frame index + step);
+    # dito dine-decode at pre-fetch ang susunod na PLAYER_PREFETCH_FRAMES na frames sa
+    # display size. Ang step > 1 ay para sa mabilis na playback (grab() lang ang nilalaktawan).
+    def __init__(self, video_path, display_size):
+        super().__init__(daemon=True)
+        self.video_path = video_path
+        self.display_size = display_size
+        self.cond = threading.Condition()
+        self.frames = OrderedDict() # frame index -> PIL image
+        self.target = 0
+        self.step = 1
+        self.running = False
+
+        self.opened = threading.Event()
+        self.fps = 20.0
+        self.frame_count = 0
+        self.eof = None        # Unang frame index na hindi na mabasa (kahit hindi alam ang haba ng file)
+        self.timestamps = None # Frame index (galing sa cache o background build)
+
+    def start(self):
+        self.running = True
+        super().start()
+        threading.Thread(target=self.load_timestamps, daemon=True).start()
+        return self
+
+    def load_timestamps(self):
+        ts = load_index(self.video_path)
+        if ts is None: ts = build_index(self.video_path)
+        if len(ts):
+            self.timestamps = ts
+            self.frame_count = len(ts)
+
+    def request(self, index, step=1):
+        with self.cond:
+            self.target = max(0, int(index))
+            self.step = max(1, int(step))
+            self.cond.notify()
+
+    def get(self, index):
+        # Ang pinakamalapit na na-decode na frame na hindi lampas sa index (para sa scrubbing)
+        with self.cond:
+            if index in self.frames: return self.frames[index]
+            earlier = [i for i in self.frames if i <= index]
+            return self.frames[max(earlier)] if earlier else None
+
+    def wanted(self):
+        # Mga frame na dapat naka-decode sa paligid ng playhead
+        limit = self.eof
+        if self.frame_count and (limit is None or self.frame_count < limit): limit = self.frame_count
+        return [self.target + k * self.step for k in range(PLAYER_PREFETCH_FRAMES)
+                if limit is None or self.target + k * self.step < limit]
+
+    def run(self):
+        cap = cv2.VideoCapture(self.video_path)
+        if cap.isOpened():
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or self.fps
+            self.frame_count = self.frame_count or int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.opened.set()
+        pos = 0 # Susunod na frame na ibibigay ng cap
+
+        while self.running and cap.isOpened():
+            with self.cond:
+                missing = [i for i in self.wanted() if i not in self.frames]
+                if not missing:
+                    # Tulog hanggang may bagong request() (o stop()); walang busy-loop sa dulo ng file
+                    self.cond.wait()
+                    continue
+                n = missing[0]
+
+            if n < pos or n - pos > PLAYER_SEEK_THRESHOLD:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, n)
+                pos = n
+            while pos < n and cap.grab():
+                pos += 1
+            ok, frame = cap.read()
+            if not ok:
+                # Dulo na ng file (o sira ang frame): huwag nang hintayin ang lampas dito
+                with self.cond:
+                    if self.eof is None or n < self.eof: self.eof = n
+                    if n > 0 and (self.frame_count == 0 or n < self.frame_count): self.frame_count = n
+                continue
+            pos += 1
+
+            frame = cv2.resize(frame, self.display_size, interpolation=cv2.INTER_AREA)
+            img = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            with self.cond:
+                self.frames[n] = img
+                # Itapon ang malayo sa playhead (may kaunting naiiwan sa likod para sa pag-rewind)
+                keep = set(self.wanted()) | set(range(self.target - self.step * 10, self.target))
+                for i in [i for i in self.frames if i not in keep]:
+                    del self.frames[i]
+        cap.release()
+
+    def stop(self):
+        self.running = False
+        with self.cond:
+            self.cond.notify()
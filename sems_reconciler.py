@@ -0,0 +1,158 @@
+import os
+import threading
+import queue
+import time
+
+from sems_config import RECONCILE_INTERVAL, RECONCILE_WATCH_INTERVAL
+from sems_db import get_db
+from sems_player import remove_index
+from sems_timeline import remove_events
+
+# Optional: watchdog (inotify sa Linux, ReadDirectoryChangesW sa Windows). Kung wala,
+# built-in na directory snapshot watcher ang gagamitin (listahan lang ng filenames kada
+# RECONCILE_WATCH_INTERVAL, walang DB query), kaya live pa rin ang paglilinis.
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+# folder -> table na may file_path papunta doon
+WATCHED_FOLDERS = {"violations": "violations", "replays": "recordings"}
+
+
+def normalize_path(path):
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+class GhostReconciler(threading.Thread):
+    # Naglilinis ng "ghost records" (DB row na wala nang video file) sa labas ng UI thread.
+    # Nakikinig sa filesystem events ng violations/ at replays/, at may full sweep kada
+    # RECONCILE_INTERVAL. Ang mga nabura ay ipinapaalam sa UI bilang ("ghosts", table, ids).
+    def __init__(self, events, interval=RECONCILE_INTERVAL):
+        super().__init__(daemon=True)
+        self.events = events
+        self.interval = interval
+        self.changes = queue.Queue()
+        self.missing = set() # Normalized paths na alam nang wala (para hindi paulit-ulit burahin)
+        self.observer = None
+        self.snapshot = None # Para sa built-in watcher: folder -> set ng filenames
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.start_watcher()
+        super().start()
+        return self
+
+    def start_watcher(self):
+        for folder in WATCHED_FOLDERS:
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+        if Observer is None:
+            print("WARNING: 'watchdog' is not installed; using the built-in folder watcher (pip install watchdog for instant updates)")
+            self.snapshot = self.list_folders()
+            return
+        try:
+            self.observer = Observer()
+            for folder in WATCHED_FOLDERS:
+                self.observer.schedule(self, os.path.abspath(folder), recursive=False)
+            self.observer.start()
+        except Exception as e:
+            print(f"WARNING: watchdog observer failed, using the built-in folder watcher: {e}")
+            self.observer = None
+            self.snapshot = self.list_folders()
+
+    def list_folders(self):
+        listing = {}
+        for folder in WATCHED_FOLDERS:
+            try:
+                listing[folder] = {entry.name for entry in os.scandir(folder) if entry.is_file()}
+            except OSError:
+                listing[folder] = set()
+        return listing
+
+    def poll_folders(self):
+        # Built-in watcher: ang nawalang filename ay parang "deleted", ang bago ay parang "created"
+        current = self.list_folders()
+        for folder, names in current.items():
+            before = self.snapshot.get(folder, set())
+            for name in before - names:
+                self.changes.put(os.path.join(folder, name))
+            for name in names - before:
+                self.missing.discard(normalize_path(os.path.join(folder, name)))
+        self.snapshot = current
+
+    def dispatch(self, event):
+        # Tinatawag ng watchdog observer thread; ipapasa lang sa sariling thread natin
+        if event.is_directory: return
+        if event.event_type in ("deleted", "moved"):
+            self.changes.put(event.src_path)
+        if event.event_type == "created":
+            self.missing.discard(normalize_path(event.src_path)) # Naibalik ang file
+        elif event.event_type == "moved":
+            # Ang destination (e.g. rename papasok sa violations/ o replays/) ay hindi "missing"
+            self.missing.discard(normalize_path(event.dest_path))
+
+    def run(self):
+        self.sweep()
+        last_sweep = time.time()
+        while self.running:
+            timeout = RECONCILE_WATCH_INTERVAL if self.snapshot is not None else self.interval
+            try:
+                path = self.changes.get(timeout=timeout)
+            except queue.Empty:
+                path = ""
+            if path is None: break
+            if path: self.check_file(path)
+            if self.snapshot is not None and not path:
+                self.poll_folders()
+            if time.time() - last_sweep >= self.interval:
+                self.sweep()
+                last_sweep = time.time()
+
+    def table_for(self, path):
+        folder = os.path.basename(os.path.dirname(normalize_path(path)))
+        for name, table in WATCHED_FOLDERS.items():
+            if folder == os.path.normcase(name):
+                return table
+        return None
+
+    def check_file(self, path):
+        table = self.table_for(path)
+        if table is None: return
+        target = normalize_path(path)
+        rows = get_db().find_by_filename(table, os.path.basename(str(path)))
+        self.remove_missing(table, [(row_id, p) for row_id, p in rows if normalize_path(p) == target])
+
+    def sweep(self):
+        # Buong pag-check ng lahat ng row (background thread, hindi ang UI)
+        for table in WATCHED_FOLDERS.values():
+            try:
+                self.remove_missing(table, get_db().fetch_file_paths(table))
+            except Exception as e:
+                print(f"ERROR: Ghost record sweep failed ({table}): {e}")
+
+    def remove_missing(self, table, rows):
+        db = get_db()
+        ghost_ids = []
+        for row_id, path in rows:
+            key = normalize_path(path)
+            if os.path.exists(key):
+                self.missing.discard(key)
+                continue
+            if key in self.missing: continue # Nakapila na ang delete nito
+            self.missing.add(key)
+            ghost_ids.append(row_id)
+            if table == "violations": db.delete_violation(row_id)
+            else: db.delete_record(row_id)
+            # Kasamang burahin ang sidecars (frame index at event timeline) ng nawalang video
+            remove_index(path)
+            remove_events(path)
+        if ghost_ids:
+            self.events.put(("ghosts", table, ghost_ids))
+
+    def stop(self):
+        self.running = False
+        self.changes.put(None)
+        if self.observer is not None:
+            self.observer.stop()
@@ -0,0 +1,160 @@
+import bisect
+import cv2
+import os
+import datetime
+import threading
+import queue
+
+from sems_config import RECORD_FPS, RECORD_SEGMENT_MINUTES, RECORD_QUEUE_SIZE, RECORD_MAX_GAP
+from sems_player import save_index
+from sems_timeline import save_events
+
+
+class SegmentedRecorder(threading.Thread):
+    # Manual recording engine ng isang camera. Ang camera worker ay nagpapasa lang ng
+    # (frame, capture timestamp); dito sa sariling thread ang encode. Ang output ay tunay na
+    # constant fps: inuulit o nilalaktawan ang frame ayon sa timestamp, hindi ayon sa loop rate.
+    # Kada segment_minutes ay bagong file, at tinatawag ang on_segment(filepath, start_datetime)
+    # para ma-register ang bawat natapos na segment. Ang resolution ng segment ay ang sa pinakabagong
+    # frame sa simula nito (hal. lilipat sa main stream pagdating ng susunod na segment).
+    def __init__(self, room_name, on_segment, folder="replays", fps=RECORD_FPS, segment_minutes=RECORD_SEGMENT_MINUTES):
+        super().__init__(daemon=True)
+        self.room_clean = room_name.replace(' ', '_')
+        self.on_segment = on_segment
+        self.folder = folder
+        self.fps = fps
+        self.segment_seconds = segment_minutes * 60
+        self.frames = queue.Queue(maxsize=RECORD_QUEUE_SIZE)
+        self.dropped = 0
+        self.running = False
+
+        self.writer = None
+        self.size = None
+        self.filepath = None
+        self.segment_start = None   # capture timestamp ng unang slot ng segment
+        self.segment_datetime = None
+        self.next_slot = None       # timestamp ng susunod na output frame
+        self.last_frame = None      # Huling frame, naka-resize na sa self.size
+        self.last_raw = None        # Huling frame sa orihinal na laki (para sa susunod na segment)
+        self.last_timestamp = None
+        # Event timeline (violations, timers, track counts) galing sa camera worker
+        self.events = []
+        self.events_lock = threading.Lock()
+
+    def start(self):
+        self.running = True
+        super().start()
+        return self
+
+    def submit(self, frame, timestamp):
+        # Hindi naghihintay ang camera worker; kapag puno, itatapon at pupunan ng duplicate ng writer
+        try:
+            self.frames.put_nowait((frame, timestamp))
+        except queue.Full:
+            self.dropped += 1
+
+    def add_event(self, timestamp, kind, label="", value=0):
+        with self.events_lock:
+            self.events.append((timestamp, kind, label, value))
+
+    def segment_events(self, final):
+        # Mga event na sakop ng kasalukuyang segment -> (frame, time, kind, label, value)
+        with self.events_lock:
+            if final:
+                taken, self.events = self.events, []
+            else:
+                taken = [e for e in self.events if e[0] < self.next_slot]
+                self.events = [e for e in self.events if e[0] >= self.next_slot]
+        # Frame = unang output frame na hindi mas maaga sa event (galing sa frame_times, hindi tantiya)
+        last_frame = max(0, len(self.frame_times) - 1)
+        return [(min(last_frame, bisect.bisect_left(self.frame_times, t)), t, kind, label, value)
+                for t, kind, label, value in taken]
+
+    def open_segment(self, timestamp):
+        # Sinisigurado ng system na may "replays" folder. Kung wala, gagawa siya auto.
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        self.segment_datetime = datetime.datetime.fromtimestamp(timestamp)
+        # May milliseconds para hindi magbanggaan ang mabilis na sunod-sunod na segments
+        date_str = self.segment_datetime.strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        self.filepath = os.path.join(self.folder, f"record_{self.room_clean}_{date_str}.avi")
+        w, h = self.size
+        self.writer = cv2.VideoWriter(self.filepath, cv2.VideoWriter_fourcc(*'XVID'), self.fps, (w, h))
+        self.segment_start = timestamp
+        self.frame_times = [] # Wall-clock ng bawat output frame, para sa frame index ng player
+
+    def close_segment(self, final=False):
+        if self.writer is None: return
+        self.writer.release()
+        self.writer = None
+        save_index(self.filepath, self.frame_times)
+        save_events(self.filepath, self.segment_events(final))
+        try:
+            self.on_segment(self.filepath, self.segment_datetime)
+        except Exception as e:
+            print(f"ERROR: Failed to register recording segment {self.filepath}: {e}")
+
+    def roll_segment(self, timestamp):
+        # Isara ang kasalukuyan at magbukas ng bago sa laki ng pinakabagong frame
+        self.close_segment()
+        h, w = self.last_raw.shape[:2]
+        if (w, h) != self.size:
+            self.size = (w, h)
+            self.last_frame = self.last_raw
+        self.open_segment(timestamp)
+
+    def write_until(self, timestamp):
+        # Punuin ang lahat ng output slots bago ang timestamp gamit ang huling frame
+        while self.next_slot < timestamp:
+            if self.next_slot - self.segment_start >= self.segment_seconds:
+                self.roll_segment(self.next_slot)
+            self.writer.write(self.last_frame)
+            self.frame_times.append(self.next_slot)
+            self.next_slot += 1.0 / self.fps
+
+    def handle(self, frame, timestamp):
+        if self.size is None:
+            h, w = frame.shape[:2]
+            self.size = (w, h)
+            self.open_segment(timestamp)
+            self.next_slot = timestamp
+        elif timestamp <= (self.next_slot - 1.0 / self.fps):
+            return # Luma o duplicate na timestamp
+        elif timestamp - self.last_timestamp > RECORD_MAX_GAP:
+            # Mahabang puwang (outage): hanggang RECORD_MAX_GAP lang ang inuulit na frame,
+            # tapos bagong segment na nagsisimula sa bumalik na frame
+            self.write_until(self.last_timestamp + RECORD_MAX_GAP)
+            self.last_raw = frame
+            self.roll_segment(timestamp)
+            self.next_slot = timestamp
+        else:
+            self.write_until(timestamp)
+
+        self.last_raw = frame
+        self.last_timestamp = timestamp
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size)
+        self.last_frame = frame
+
+    def run(self):
+        while True:
+            try:
+                item = self.frames.get(timeout=0.5)
+            except queue.Empty:
+                if not self.running: break
+                continue
+            if item is None: break
+            self.handle(*item)
+
+        # Huling frame at ang natitirang segment
+        if self.last_frame is not None and self.writer is not None:
+            self.write_until(self.next_slot + 0.5 / self.fps)
+        self.close_segment(final=True)
+
+    def stop(self):
+        # Hindi hinihintay dito: tatapusin ng thread ang nakapila at ire-register ang huling segment
+        self.running = False
+        try:
+            self.frames.put(None, timeout=1.0)
+        except queue.Full:
+            pass
@@ -0,0 +1,264 @@
+import cv2
+import threading
+import time
+
+from sems_config import (FRAME_RING_SLOTS, STREAM_STALL_TIMEOUT, RECONNECT_BACKOFF_MIN, RECONNECT_BACKOFF_MAX,
+                         MAX_READ_FAILURES, CAPTURE_TIMEOUT_MSEC)
+
+
+class FrameRef:
+    # Hawak ng consumer ang isang ring slot nang walang kopya. Habang hindi pa
+    # nire-release, hindi ito papatungan ng capture thread.
+    def __init__(self, stream, index, frame, seq, timestamp):
+        self.stream = stream
+        self.index = index
+        self.frame = frame
+        self.seq = seq
+        self.timestamp = timestamp
+
+    def release(self):
+        if self.stream is not None:
+            self.stream.unpin(self.index)
+            self.stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def substream_url(url):
+    # Tapo: ".../stream1" ang main (full-res), ".../stream2" ang low-res substream
+    if isinstance(url, str) and url.lower().startswith("rtsp://"):
+        base = url.rstrip("/")
+        if base.endswith("/stream1"):
+            return base[:-len("stream1")] + "stream2"
+    return None
+
+
+class VideoStream:
+    # resolution=None para sa substream (hayaan ang camera sa native na low-res)
+    # active=False para sa main stream na binubuksan lang habang may nire-record
+    def __init__(self, src, slots=FRAME_RING_SLOTS, resolution=(1920, 1080), active=True):
+        # Walang binubuksan dito; sa capture thread na ang cv2.VideoCapture para hindi ma-block
+        # ang UI (lalo na kapag unreachable ang RTSP camera at hinihintay ang FFmpeg timeout)
+        self.src = src
+        self.resolution = resolution
+        self.active = active
+        self.active_event = threading.Event()
+        if active: self.active_event.set()
+        self.cap = None
+        # Health state: connecting -> live -> stalled -> reconnecting -> live ...
+        self.status = "connecting"
+        self.last_frame_time = 0.0
+        self.reconnect_requested = False
+        # QoS: 0 = i-decode lahat; > 0 = grab() lang at retrieve() kada ganitong segundo
+        self.retrieve_interval = 0.0
+        self.last_retrieve = 0.0
+        self.wakeup = threading.Event()
+
+        # --- FRAME RING BUFFER ---
+        # Bawat slot: decoded frame + sequence number + capture timestamp + ilang consumer ang may hawak
+        self.ring = [{"frame": None, "seq": 0, "ts": 0.0, "pins": 0} for _ in range(max(3, slots))]
+        self.latest = -1
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.grabbed = False
+        self.started = False
+
+    def start(self):
+        if self.started: return self
+        self.started = True
+        self.thread = threading.Thread(target=self.update, args=(), daemon=True)
+        self.thread.start()
+        return self
+
+    def open_capture(self):
+        if isinstance(self.src, int):
+            cap = cv2.VideoCapture(self.src)
+        else:
+            # Open/read timeout (OpenCV 4.6+) para bumalik ang read() kapag naputol ang RTSP
+            params = []
+            if hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+                params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, CAPTURE_TIMEOUT_MSEC, cv2.CAP_PROP_READ_TIMEOUT_MSEC, CAPTURE_TIMEOUT_MSEC]
+            cap = cv2.VideoCapture(self.src, cv2.CAP_FFMPEG, params) if params else cv2.VideoCapture(self.src, cv2.CAP_FFMPEG)
+
+        if self.resolution:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def close_capture(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def sleep(self, seconds):
+        # Natutulog habang down ang camera (hindi busy-loop); ginigising ng stop()
+        self.wakeup.wait(seconds)
+
+    def request_reconnect(self):
+        self.reconnect_requested = True
+
+    def set_retrieve_interval(self, seconds):
+        self.retrieve_interval = seconds
+
+    def set_active(self, active):
+        # Kapag inactive, isinasara ang capture para walang decode na nangyayari
+        self.active = active
+        if active: self.active_event.set()
+        else: self.active_event.clear()
+
+    def update(self):
+        backoff = RECONNECT_BACKOFF_MIN
+        failures = 0
+
+        while self.started:
+            # --- IDLE (e.g. main stream habang walang recording) ---
+            if not self.active:
+                self.close_capture()
+                self.status = "idle"
+                self.active_event.wait(0.5)
+                continue
+
+            # --- (RE)CONNECT ---
+            if self.cap is None:
+                self.status = "connecting" if self.seq == 0 else "reconnecting"
+                self.cap = self.open_capture()
+                if not self.cap.isOpened():
+                    self.close_capture()
+                    self.sleep(backoff)
+                    backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+                    continue
+                failures = 0
+                self.reconnect_requested = False
+                self.last_frame_time = time.time() # Palugit bago ma-stall ulit
+
+            if self.retrieve_interval > 0 and time.time() - self.last_retrieve < self.retrieve_interval:
+                # Hidden/reduced camera: grab() lang para hindi maipon ang lumang frames,
+                # walang retrieve() (color conversion + kopya)
+                grabbed, frame = self.cap.grab(), None
+            else:
+                with self.cond:
+                    index = self.free_slot()
+                    buf = self.ring[index]["frame"] if index is not None else None
+                if index is None:
+                    # Lahat ng slot ay hawak pa ng consumers, itapon na lang ang frame na ito
+                    self.cap.grab()
+                    continue
+
+                # I-decode diretso sa lumang buffer ng slot (walang bagong 6 MB allocation kada frame)
+                grabbed, frame = self.cap.read(buf) if buf is not None else self.cap.read()
+                if grabbed: self.last_retrieve = time.time()
+
+            if grabbed:
+                failures = 0
+                self.reconnect_requested = False # Kusang bumalik ang stream
+                backoff = RECONNECT_BACKOFF_MIN
+                self.status = "live"
+                if frame is not None: self.publish(index, frame)
+            else:
+                failures += 1
+                self.sleep(0.02)
+
+            # --- STALL / DROP: i-release at buksan ulit, may exponential backoff ---
+            if self.started and (self.reconnect_requested or failures >= MAX_READ_FAILURES):
+                print(f"WARNING: Stream {self.display_name()} stalled, reconnecting in {backoff:.0f}s")
+                self.close_capture()
+                self.status = "reconnecting"
+                self.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX)
+
+        self.close_capture()
+
+    def display_name(self):
+        # Itago ang password ng RTSP link sa logs
+        src = str(self.src)
+        return src.split("@")[-1] if "@" in src else src
+
+    def free_slot(self):
+        # Ang susunod na slot na hindi pinakabago at walang naka-pin (tinatawag habang hawak ang lock)
+        n = len(self.ring)
+        for k in range(1, n + 1):
+            i = (self.latest + k) % n
+            if i != self.latest and self.ring[i]["pins"] == 0:
+                return i
+        return None
+
+    def publish(self, index, frame):
+        with self.cond:
+            self.seq += 1
+            self.last_frame_time = time.time()
+            self.ring[index].update({"frame": frame, "seq": self.seq, "ts": self.last_frame_time})
+            self.latest = index
+            self.grabbed = True
+            self.cond.notify_all()
+
+    def read_newer(self, last_seq, timeout=None):
+        # Ibigay ang pinakabagong frame na mas bago sa last_seq (None kung wala pa sa loob ng timeout)
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.latest >= 0 and self.seq > last_seq, timeout):
+                return None
+            slot = self.ring[self.latest]
+            slot["pins"] += 1
+            return FrameRef(self, self.latest, slot["frame"], slot["seq"], slot["ts"])
+
+    def unpin(self, index):
+        with self.cond:
+            self.ring[index]["pins"] -= 1
+
+    def read(self):
+        # Kopya ng pinakabagong frame, para sa mga hindi dumadaan sa read_newer()
+        with self.cond:
+            if self.latest >= 0:
+                return self.grabbed, self.ring[self.latest]["frame"].copy()
+            return False, None
+
+    def stop(self):
+        self.started = False
+        self.wakeup.set()
+        self.active_event.set()
+        with self.cond:
+            self.cond.notify_all()
+        # Hindi hinihintay nang matagal: kung naka-block pa sa pagbukas, ang thread na ang magre-release
+        if hasattr(self, 'thread'): self.thread.join(timeout=2)
+
+
+class StreamSupervisor(threading.Thread):
+    # Nagbabantay sa edad ng huling frame ng bawat stream. Hiwalay na thread ito dahil
+    # ang capture thread mismo ay pwedeng naka-block sa cap.read() habang patay ang camera.
+    def __init__(self, interval=1.0):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.streams = set()
+        self.lock = threading.Lock()
+        self.running = False
+
+    def start(self):
+        self.running = True
+        super().start()
+        return self
+
+    def watch(self, stream):
+        with self.lock:
+            self.streams.add(stream)
+
+    def unwatch(self, stream):
+        with self.lock:
+            self.streams.discard(stream)
+
+    def run(self):
+        while self.running:
+            now = time.time()
+            with self.lock:
+                streams = list(self.streams)
+            for stream in streams:
+                if stream.status == "live" and now - stream.last_frame_time > STREAM_STALL_TIMEOUT:
+                    stream.status = "stalled"
+                    stream.request_reconnect()
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,155 @@
+import cv2
+import os
+import hashlib
+import threading
+import queue
+from collections import OrderedDict
+from PIL import Image
+
+from sems_config import THUMBNAIL_DIR, THUMBNAIL_CACHE_MB, THUMBNAIL_MEMORY_ITEMS
+
+THUMBNAIL_SIZE = (280, 160)
+
+
+class ThumbnailCache:
+    # Persistent na thumbnails ng recordings (JPEG sa THUMBNAIL_DIR). Ang key ay path + size
+    # + mtime ng video, kaya kusa itong nag-i-invalidate kapag napalitan ang file.
+    # LRU ang eviction (mtime ng thumbnail = huling gamit) at may max na laki sa disk.
+    # Ang pag-decode ng video ay sa background thread; ang UI ay kumukuha sa `ready` queue.
+    def __init__(self, folder=THUMBNAIL_DIR, max_bytes=THUMBNAIL_CACHE_MB * 1024 * 1024, size=THUMBNAIL_SIZE):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.size = size
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+        self.lock = threading.Lock()
+        # Disk index: filename -> [bytes, last_used]
+        self.index = {}
+        for name in os.listdir(folder):
+            p = os.path.join(folder, name)
+            if os.path.isfile(p):
+                st = os.stat(p)
+                self.index[name] = [st.st_size, st.st_mtime]
+        self.total_bytes = sum(v[0] for v in self.index.values())
+        # Maliit na in-memory LRU para hindi na magbasa ng disk kapag bumalik sa Replay tab
+        self.memory = OrderedDict()
+
+        self.jobs = queue.Queue()
+        self.queued = set()
+        self.ready = queue.Queue() # (video path, PIL image o None)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def key(self, video_path):
+        try:
+            st = os.stat(video_path)
+        except OSError:
+            return None
+        raw = f"{os.path.abspath(video_path)}|{st.st_size}|{st.st_mtime_ns}|{self.size[0]}x{self.size[1]}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest() + ".jpg"
+
+    def get(self, video_path):
+        # Mabilis na lookup (memory/disk lang, walang video decode). None kung wala pa.
+        name = self.key(video_path)
+        if name is None: return None
+        with self.lock:
+            if name in self.memory:
+                self.memory.move_to_end(name)
+                return self.memory[name]
+            known = name in self.index
+        if not known: return None
+        try:
+            img = Image.open(os.path.join(self.folder, name))
+            img.load()
+        except Exception:
+            return None
+        self.touch(name)
+        self.remember(name, img)
+        return img
+
+    def request(self, video_path):
+        # Ibibigay agad kung naka-cache; kung hindi, gagawin sa background at lalabas sa `ready`
+        img = self.get(video_path)
+        if img is None: self.prefetch(video_path)
+        return img
+
+    def prefetch(self, video_path):
+        with self.lock:
+            if video_path in self.queued: return
+            self.queued.add(video_path)
+        self.jobs.put(video_path)
+
+    def run(self):
+        while True:
+            video_path = self.jobs.get()
+            img = None
+            try:
+                img = self.get(video_path) or self.generate(video_path)
+            except Exception as e:
+                print(f"ERROR: Thumbnail failed for {video_path}: {e}")
+            with self.lock:
+                self.queued.discard(video_path)
+            self.ready.put((video_path, img))
+
+    def generate(self, video_path):
+        name = self.key(video_path)
+        if name is None: return None
+        cap = cv2.VideoCapture(video_path)
+        ret, frame = cap.read()
+        cap.release()
+        if not ret: return None
+
+        frame = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), self.size, interpolation=cv2.INTER_AREA)
+        img = Image.fromarray(frame)
+        path = os.path.join(self.folder, name)
+        img.save(path, "JPEG", quality=85)
+        size = os.path.getsize(path)
+        with self.lock:
+            self.index[name] = [size, os.path.getmtime(path)]
+            self.total_bytes += size
+        self.remember(name, img)
+        self.evict()
+        return img
+
+    def touch(self, name):
+        # LRU: ang mtime ng thumbnail file ang "huling ginamit"
+        try:
+            os.utime(os.path.join(self.folder, name))
+        except OSError:
+            pass
+        with self.lock:
+            if name in self.index:
+                self.index[name][1] = os.path.getmtime(os.path.join(self.folder, name))
+
+    def remember(self, name, img):
+        with self.lock:
+            self.memory[name] = img
+            self.memory.move_to_end(name)
+            while len(self.memory) > THUMBNAIL_MEMORY_ITEMS:
+                self.memory.popitem(last=False)
+
+    def evict(self):
+        with self.lock:
+            if self.total_bytes <= self.max_bytes: return
+            oldest = sorted(self.index.items(), key=lambda kv: kv[1][1])
+            for name, (size, _) in oldest:
+                if self.total_bytes <= self.max_bytes: break
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+                del self.index[name]
+                self.memory.pop(name, None)
+                self.total_bytes -= size
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_thumbnails():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache()
+        return _cache
@@ -0,0 +1,56 @@
+import os
+import sqlite3
+
+# =========================================================================
+# EVENT TIMELINE SIDECAR (record_X.avi -> record_X.avi.events.db)
+# Maliit na SQLite kada recording segment: mga nangyari habang nagre-record, naka-index
+# sa frame number ng video para diretsong ma-seek ng player.
+# =========================================================================
+EVENT_VIOLATION = "violation"
+EVENT_TIMER_START = "timer_start"
+EVENT_TIMER_STOP = "timer_stop"
+EVENT_TRACKS = "tracks"
+
+
+def events_path(video_path):
+    return str(video_path) + ".events.db"
+
+
+def save_events(video_path, events):
+    # events = [(frame, time, kind, label, value), ...]
+    path = events_path(video_path)
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE IF NOT EXISTS events (frame INTEGER, time REAL, kind TEXT, label TEXT, value INTEGER)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_events_frame ON events (frame)")
+        conn.executemany("INSERT INTO events (frame, time, kind, label, value) VALUES (?, ?, ?, ?, ?)", events)
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"WARNING: Could not save event timeline for {video_path}: {e}")
+
+
+def load_events(video_path, kinds=None):
+    # -> [(frame, time, kind, label, value)] ayon sa frame; [] kung walang sidecar
+    path = events_path(video_path)
+    if not os.path.exists(path): return []
+    try:
+        conn = sqlite3.connect(path)
+        sql = "SELECT frame, time, kind, label, value FROM events"
+        params = []
+        if kinds:
+            sql += " WHERE kind IN (" + ",".join("?" * len(kinds)) + ")"
+            params = list(kinds)
+        rows = conn.execute(sql + " ORDER BY frame", params).fetchall()
+        conn.close()
+        return rows
+    except Exception as e:
+        print(f"WARNING: Could not read event timeline for {video_path}: {e}")
+        return []
+
+
+def remove_events(video_path):
+    try:
+        os.remove(events_path(video_path))
+    except OSError:
+        pass
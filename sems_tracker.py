@@ -0,0 +1,149 @@
+import cv2
+import numpy as np
+
+from sems_config import FLOW_WIDTH
+
+
+class FlowPropagator:
+    # Ginagalaw ang mga box sa pagitan ng full detections gamit ang Lucas-Kanade optical flow
+    # sa maliit na grayscale frame. Mas mura ito nang malaki kaysa MediaPipe + MobileNet-SSD.
+    def __init__(self, width=FLOW_WIDTH, grid=3):
+        self.width = width
+        self.grid = grid
+        self.prev_gray = None
+        self.scale = 1.0
+
+    def prepare(self, frame):
+        ih, iw = frame.shape[:2]
+        self.scale = min(1.0, self.width / float(iw))
+        small = cv2.resize(frame, (int(iw * self.scale), int(ih * self.scale)), interpolation=cv2.INTER_AREA) if self.scale < 1.0 else frame
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def reset(self, frame):
+        # Tinatawag sa bawat full detection para dito magsimula ang susunod na flow
+        self.prev_gray = self.prepare(frame)
+
+    def propagate(self, frame, boxes):
+        # boxes = [(x, y, w, h), ...] sa full-res coordinates
+        # -> (bagong boxes, confidence 0..1 kada box)
+        gray = self.prepare(frame)
+        prev, self.prev_gray = self.prev_gray, gray
+        if prev is None or prev.shape != gray.shape or len(boxes) == 0:
+            return list(boxes), [0.0] * len(boxes)
+
+        b = np.asarray(boxes, dtype=np.float32) * self.scale
+        # Grid ng points sa loob ng bawat box (iniiwasan ang gilid)
+        steps = (np.arange(self.grid, dtype=np.float32) + 1) / (self.grid + 1)
+        gx, gy = np.meshgrid(steps, steps)
+        gx, gy = gx.ravel(), gy.ravel()
+        px = b[:, 0:1] + gx[None, :] * b[:, 2:3]
+        py = b[:, 1:2] + gy[None, :] * b[:, 3:4]
+        p0 = np.stack([px, py], axis=-1).reshape(-1, 1, 2).astype(np.float32)
+
+        lk = dict(winSize=(15, 15), maxLevel=2, criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+        p1, st1, _ = cv2.calcOpticalFlowPyrLK(prev, gray, p0, None, **lk)
+        # Forward-backward check: ang point na hindi bumalik sa pinanggalingan ay hindi maaasahan
+        p0r, st2, _ = cv2.calcOpticalFlowPyrLK(gray, prev, p1, None, **lk)
+        fb_err = np.linalg.norm((p0 - p0r).reshape(-1, 2), axis=1)
+        good = (st1.ravel() == 1) & (st2.ravel() == 1) & (fb_err < 1.0)
+
+        n_pts = gx.size
+        good = good.reshape(-1, n_pts)
+        motion = (p1 - p0).reshape(-1, n_pts, 2)
+        confidences = good.mean(axis=1)
+
+        new_boxes = []
+        for i, (x, y, w, h) in enumerate(boxes):
+            if good[i].any():
+                dx, dy = np.median(motion[i][good[i]], axis=0) / self.scale
+                new_boxes.append((int(x + dx), int(y + dy), w, h))
+            else:
+                new_boxes.append((x, y, w, h))
+        return new_boxes, confidences.tolist()
+
+
+# --- TRACK ASSOCIATION (Exam Monitoring) ---
+# Optional ang scipy; kung wala, gagamitin ang NumPy Hungarian sa ibaba
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+BLOCKED_COST = 1e6
+
+
+def hungarian(cost):
+    # Minimum-cost assignment (Kuhn-Munkres, O(n^2 m)); ang inner loop ay vectorized sa columns.
+    # -> (rows, cols) na parehong format ng scipy.optimize.linear_sum_assignment
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed: cost = cost.T
+    n, m = cost.shape
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)   # p[j] = row (1-based) na naka-assign sa column j
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            masked = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(masked)) + 1
+            delta = masked[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0: break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.nonzero(p[1:])[0]
+    rows = p[1:][cols] - 1
+    if transposed: rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def box_iou(a, b):
+    # a: (N, 4), b: (M, 4) na (x, y, w, h) -> (N, M) IoU matrix
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[None, :, 0], b[None, :, 1]
+    bx2, by2 = bx1 + b[None, :, 2], by1 + b[None, :, 3]
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = iw * ih
+    union = (a[:, 2:3] * a[:, 3:4]) + (b[None, :, 2] * b[None, :, 3]) - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+def associate(track_boxes, track_centers, cand_boxes, cand_centers, max_dist):
+    # Isang cost matrix para sa lahat ng track x candidate: normalized center distance + (1 - IoU).
+    # Bawal ang pares na lampas sa max_dist (parehong gate ng dating greedy tracker).
+    # -> (matched track indices, matched candidate indices)
+    if len(track_boxes) == 0 or len(cand_boxes) == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    dist = np.linalg.norm(track_centers[:, None, :] - cand_centers[None, :, :], axis=2)
+    cost = dist / max_dist + (1.0 - box_iou(track_boxes, cand_boxes))
+    allowed = dist < max_dist
+    cost[~allowed] = BLOCKED_COST
+
+    solve = linear_sum_assignment or hungarian
+    rows, cols = solve(cost)
+    keep = allowed[rows, cols]
+    return rows[keep], cols[keep]